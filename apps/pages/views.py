@@ -12,6 +12,11 @@ from django.utils import timezone
 from datetime import timedelta
 import json
 
+from wallet.money import from_cents
+from wallet.query_cache import cached_cursor
+from wallet.catalog import get_catalog
+from wallet.days import day_number
+
 #from .models import *
 
 def index(request):
@@ -43,100 +48,24 @@ def index(request):
   with connection.cursor() as cur:
         cur.executescript("PRAGMA foreign_keys = ON;")
 
-  cards = {}
-  with connection.cursor() as cur:
-      cur.execute("""
-        SELECT id, card_name, issuer, COALESCE(annual_fee, 0), type, COALESCE(base_reward_rate, 0)
-        FROM cards
-        ORDER BY issuer, card_name
-      """)
-      for cid, name, issuer, fee, ctype, base_rate in cur.fetchall():
-          cards[cid] = {
-              "id": cid,
-              "card_name": name or "",
-              "issuer": issuer or "",
-              "annual_fee": float(fee or 0),
-              "type": ctype or "",
-              "base_reward_rate": float(base_rate or 0),
-              "bonus_categories": [],
-              "perks": [],
-              "welcome_bonus": None,
-              "current_period": None,
-          }
+  cards = {c["id"]: c for c in get_catalog().cards_for(request.user.id)}
 
   if not cards:
       return render(request, "wallet/deals.html", {"cards": [], "issuers": []})
 
-  valid_ids = set(cards.keys())
-
-  with connection.cursor() as cur:
-      cur.execute("""
-        SELECT card_id, idx, category_name, reward_rate, cap, note
-        FROM bonus_categories
-        ORDER BY card_id, idx
-      """)
-      for card_id, idx, cat_name, rate, cap, note in cur.fetchall():
-          if card_id in valid_ids:
-              cards[card_id]["bonus_categories"].append({
-                  "category_name": cat_name or "",
-                  "reward_rate": float(rate or 0),
-                  "cap": None if cap is None else float(cap),
-                  "note": note or "",
-              })
-
-  with connection.cursor() as cur:
-      cur.execute("""
-        SELECT card_id, idx, perk_name, description, frequency
-        FROM perks
-        ORDER BY card_id, idx
-      """)
-      for card_id, idx, perk_name, desc, freq in cur.fetchall():
-          if card_id in valid_ids:
-              cards[card_id]["perks"].append({
-                  "perk_name": perk_name or "",
-                  "description": desc or "",
-                  "frequency": freq or "",
-              })
-
-  with connection.cursor() as cur:
-      cur.execute("""
-        SELECT card_id, points, cash_back, points_or_cash, spend_requirement, time_frame_months
-        FROM welcome_bonuses
-      """)
-      for card_id, points, cash_back, poc, spend_req, tf_months in cur.fetchall():
-          if card_id in valid_ids:
-              cards[card_id]["welcome_bonus"] = {
-                  "points": None if points is None else int(points),
-                  "cash_back": None if cash_back is None else float(cash_back),
-                  "points_or_cash": None if poc is None else float(poc),
-                  "spend_requirement": None if spend_req is None else float(spend_req),
-                  "time_frame_months": None if tf_months is None else int(tf_months),
-              }
-
-  with connection.cursor() as cur:
-      cur.execute("""
-        SELECT card_id, start_date, end_date
-        FROM card_current_period
-      """)
-      for card_id, start_date, end_date in cur.fetchall():
-          if card_id in valid_ids:
-              cards[card_id]["current_period"] = {
-                  "start_date": start_date,
-                  "end_date": end_date,
-              }
-
   all_deals = list(Deal.objects.all())
   deals = random.sample(all_deals, min(2, len(all_deals)))
 
   issuers = sorted({(c["issuer"] or "").strip() for c in cards.values() if c["issuer"]})
 
-  today = timezone.localdate().isoformat()
-  with connection.cursor() as cur:
+  today = day_number(timezone.localdate())
+  with cached_cursor() as cur:
       cur.execute(
-          "SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE date = %s",
-          [today],
+          "SELECT COALESCE(SUM(total_cents), 0) FROM daily_spend"
+          " WHERE user_id = %s AND day_num = %s AND category_id = 0",
+          [request.user.id, today],
       )
-      daily_spent = float(cur.fetchone()[0] or 0)
+      daily_spent = from_cents(cur.fetchone()[0])
 
   # Past 7 days (including today) spending for the line chart
   end_date = timezone.localdate()
@@ -144,18 +73,18 @@ def index(request):
   date_keys = [(start_date + timedelta(days=i)) for i in range(7)]
   date_strs = [d.isoformat() for d in date_keys]
   totals_by_date = {d: 0.0 for d in date_strs}
-  with connection.cursor() as cur:
+  with cached_cursor() as cur:
       cur.execute(
           """
-          SELECT date, COALESCE(SUM(amount), 0)
-          FROM transactions
-          WHERE date BETWEEN %s AND %s
-          GROUP BY date
+          SELECT day, COALESCE(SUM(total_cents), 0)
+          FROM daily_spend
+          WHERE user_id = %s AND day_num BETWEEN %s AND %s AND category_id = 0
+          GROUP BY day_num
           """,
-          [start_date.isoformat(), end_date.isoformat()],
+          [request.user.id, day_number(start_date), day_number(end_date)],
       )
-      for tx_date, total in cur.fetchall():
-          totals_by_date[str(tx_date)] = float(total or 0)
+      for tx_date, total_cents in cur.fetchall():
+          totals_by_date[str(tx_date)] = from_cents(total_cents)
   widget_line_categories = [d.strftime("%a") for d in date_keys]
   widget_line_series = [totals_by_date[d] for d in date_strs]
 
@@ -164,24 +93,28 @@ def index(request):
   current_week_end = end_date
   previous_week_start = current_week_start - timedelta(days=7)
   previous_week_end = current_week_start - timedelta(days=1)
-  with connection.cursor() as cur:
+  with cached_cursor() as cur:
       cur.execute(
           """
           SELECT
-            COALESCE(SUM(CASE WHEN date BETWEEN %s AND %s THEN amount END), 0),
-            COALESCE(SUM(CASE WHEN date BETWEEN %s AND %s THEN amount END), 0)
-          FROM transactions
+            COALESCE(SUM(CASE WHEN day_num BETWEEN %s AND %s THEN total_cents END), 0),
+            COALESCE(SUM(CASE WHEN day_num BETWEEN %s AND %s THEN total_cents END), 0)
+          FROM daily_spend
+          WHERE user_id = %s AND day_num BETWEEN %s AND %s AND category_id = 0
           """,
           [
-              current_week_start.isoformat(),
-              current_week_end.isoformat(),
-              previous_week_start.isoformat(),
-              previous_week_end.isoformat(),
+              day_number(current_week_start),
+              day_number(current_week_end),
+              day_number(previous_week_start),
+              day_number(previous_week_end),
+              request.user.id,
+              day_number(previous_week_start),
+              day_number(current_week_end),
           ],
       )
       current_week_spent, previous_week_spent = cur.fetchone()
-  current_week_spent = float(current_week_spent or 0)
-  previous_week_spent = float(previous_week_spent or 0)
+  current_week_spent = from_cents(current_week_spent)
+  previous_week_spent = from_cents(previous_week_spent)
   
   # all the deals stuff
   context = {
@@ -10,7 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
-import os, random, string, inspect
+import os, random, string, inspect, sys, tempfile, atexit, shutil
 from pathlib import Path
 from dotenv import load_dotenv
 from str2bool import str2bool
@@ -135,6 +135,31 @@ else:
         }
     }
 
+# Raw Plaid/bills tables: how old (seconds) the last sync may be before a page
+# view kicks off a background refresh (see wallet/sync.py)
+PLAID_SYNC_TTL = int(os.getenv('PLAID_SYNC_TTL', 15 * 60))
+
+# Raw Plaid/bills/perks tables live in their own SQLite file so bulk loads don't
+# lock sessions/auth; it is ATTACHed to every Django connection as INGEST_DB_ALIAS
+INGEST_DB_PATH  = os.getenv('INGEST_DB_PATH', str(BASE_DIR / 'ingest.sqlite3'))
+INGEST_DB_ALIAS = 'ingest'
+
+# `manage.py test` gets a throwaway ingest file (Django only swaps out 'default')
+if sys.argv[1:2] == ['test']:
+    _INGEST_TEST_DIR = tempfile.mkdtemp(prefix='ingest-test-')
+    atexit.register(shutil.rmtree, _INGEST_TEST_DIR, ignore_errors=True)
+    INGEST_DB_PATH = os.path.join(_INGEST_TEST_DIR, 'ingest.sqlite3')
+
+# PRAGMA profile for every SQLite connection: web | durable | legacy. The
+# SQLITE_PROFILE env var is read by sqlite_profile.py (imported here, after
+# load_dotenv) so Django and the loaders can't disagree
+import sqlite_profile
+SQLITE_PROFILE = sqlite_profile.DEFAULT_PROFILE
+
+# Per-process cache of dashboard query results over the ingest tables, in bytes
+# (LRU; see wallet/query_cache.py). 0 turns it off
+QUERY_CACHE_MAX_BYTES = int(os.getenv('QUERY_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -0,0 +1,66 @@
+# data_version.py
+"""
+Named change counters for caches built from the ingest tables. A writer bumps
+the counter in the same transaction as its write; a reader keeps whatever it
+built together with the counter value it was built at, and rebuilds only when
+the counter has moved (see wallet/catalog.py).
+
+Counters start over at 1 when the ingest DB is deleted and reloaded, so readers
+that can outlive the file (per-process caches, the shared Django cache) key on
+generation() -- the counter plus a random id drawn when data_versions was
+created -- which never repeats.
+
+    data_version.bump(cur, data_version.CARD_CATALOG)    # inside the write transaction
+    if data_version.generation(cur, data_version.CARD_CATALOG) != built_at:
+        ...rebuild...
+"""
+import sqlite3
+
+# cards + bonus_categories/perks/welcome_bonuses/card_current_period + deals
+CARD_CATALOG = "card_catalog"
+
+# any committed write to the ingest tables (see wallet/query_cache.py)
+INGEST = "ingest"
+
+# not a counter: the random id of this data_versions table (see generation())
+INSTANCE = "instance"
+
+
+def spending_key(user_id) -> str:
+    """One user's transactions (via daily_spend) -- see wallet/alerts.py."""
+    return f"spending:{user_id}"
+
+
+def _table(schema):
+    return f"{schema}.data_versions" if schema else "data_versions"
+
+
+def ensure_table(cur: sqlite3.Cursor, schema: str = None):
+    """schema: the attached database to create it in (e.g. "ingest" on Django's connection)."""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {_table(schema)} (
+          name     TEXT PRIMARY KEY,
+          version  INTEGER NOT NULL
+        )
+    """)
+    cur.execute(f"INSERT OR IGNORE INTO {_table(schema)} (name, version) VALUES (?, random())", (INSTANCE,))
+
+
+def bump(cur: sqlite3.Cursor, name: str, schema: str = None):
+    ensure_table(cur, schema)
+    cur.execute(f"""
+        INSERT INTO {_table(schema)} (name, version) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+    """, (name,))
+
+
+def generation(cur, name: str, placeholder: str = "?"):
+    """
+    (instance, version) of the counter; version is None if nothing has bumped it
+    yet. placeholder is "%s" on a Django cursor. Raises the driver's error when
+    there is no data_versions table yet.
+    """
+    cur.execute(f"SELECT name, version FROM data_versions WHERE name IN ({placeholder}, {placeholder})",
+                (INSTANCE, name))
+    found = dict(cur.fetchall())
+    return found.get(INSTANCE), found.get(name)
@@ -0,0 +1,133 @@
+# json_stream.py
+"""
+Incremental JSON reading for the loaders.
+
+Walks a top-level array, or the array members of a top-level object, one element
+at a time so memory stays flat however large the file is. Stdlib only: each
+element is decoded with json.JSONDecoder.raw_decode from a rolling buffer.
+
+    with open("bills.json", encoding="utf-8") as f:
+        for key, value in iter_members(f, stream_keys={"transactions"}):
+            if key == "transactions":
+                for t in value: ...     # one dict at a time
+"""
+import json
+from typing import Any, Iterable, Iterator, TextIO, Tuple
+
+CHUNK_SIZE = 1 << 16   # characters read per refill
+
+_WS = " \t\n\r"
+_NUM_CONT = "0123456789.eE+-"
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    def __init__(self, fp: TextIO, chunk_size: int):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        # drop what we've already consumed so the buffer stays ~one element wide
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at EOF), without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str):
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"Expected {ch!r} but found {got or 'EOF'!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode one complete JSON value, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number cut by the chunk boundary ("12" + "34", "2." + "5") decodes
+            # too early; read on until something that can't continue it follows
+            if (not self.eof and isinstance(obj, (int, float))
+                    and (end == len(self.buf) or self.buf[end] in _NUM_CONT)
+                    and self._fill()):
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_array(r: _Reader) -> Iterator[Any]:
+    r.expect("[")
+    if r.peek() == "]":
+        r.pos += 1
+        return
+    while True:
+        yield r.value()
+        sep = r.peek()
+        r.pos += 1
+        if sep == "]":
+            return
+        if sep != ",":
+            raise ValueError(f"Expected ',' or ']' in array but found {sep or 'EOF'!r}")
+
+
+def iter_items(fp: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array; a top-level object is yielded once."""
+    r = _Reader(fp, chunk_size)
+    if r.peek() == "[":
+        yield from _iter_array(r)
+    else:
+        yield r.value()
+
+
+def iter_members(fp: TextIO, stream_keys: Iterable[str] = (),
+                 chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (key, value) for each member of a top-level JSON object, in file order.
+
+    For keys in stream_keys whose value is an array, value is an iterator over the
+    array's elements instead of a list. Consume it before advancing; whatever is
+    left is skipped automatically.
+    """
+    stream_keys = set(stream_keys)
+    r = _Reader(fp, chunk_size)
+    r.expect("{")
+    if r.peek() == "}":
+        return
+    while True:
+        key = r.value()
+        r.expect(":")
+        if key in stream_keys and r.peek() == "[":
+            elements = _iter_array(r)
+            yield key, elements
+            for _ in elements:
+                pass
+        else:
+            yield key, r.value()
+        sep = r.peek()
+        r.pos += 1
+        if sep == "}":
+            return
+        if sep != ",":
+            raise ValueError(f"Expected ',' or '}}' in object but found {sep or 'EOF'!r}")
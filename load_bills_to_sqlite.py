@@ -1,6 +1,38 @@
-import json, sqlite3, sys, os, re, hashlib
+import sqlite3, sys, os, re, hashlib, time
 from datetime import date, timedelta
 
+import data_version, load_manifest, sqlite_profile
+from json_stream import iter_members
+from wallet.money import to_cents   # plain Python, no Django
+
+# Bump when ensure_schema gains a backfill for existing rows (PRAGMA user_version)
+SCHEMA_VERSION = 6
+
+# Django user (auth_user.id) that owns rows loaded without an explicit user_id --
+# a single-user install loads everything for user 1
+DEFAULT_USER_ID = int(os.getenv("INGEST_USER_ID", "1"))
+
+# per-day rollup of transactions, kept current by the write functions below
+# (refresh_daily_spend). category_id 0 = day totals; other ids = the transaction's
+# primary_category, so every transaction is counted exactly once either way.
+# Keyed by (user_id, day_num) so one user's date window is an integer range scan
+# (see _day_buckets).
+DAILY_SPEND_DDL = """
+    CREATE TABLE IF NOT EXISTS daily_spend (
+      user_id      INTEGER NOT NULL,
+      day_num      INTEGER NOT NULL,
+      account_id   TEXT    NOT NULL,
+      category_id  INTEGER NOT NULL,
+      day          TEXT    NOT NULL,
+      week         INTEGER NOT NULL,
+      month        INTEGER NOT NULL,
+      total_cents  INTEGER NOT NULL,
+      count        INTEGER NOT NULL,
+      PRIMARY KEY (user_id, day_num, account_id, category_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_daily_spend_day ON daily_spend(day_num);
+"""
+
 def ensure_schema(cur):
     cur.executescript("""
     PRAGMA foreign_keys = ON;
@@ -11,17 +43,25 @@ def ensure_schema(cur):
       name           TEXT,
       official_name  TEXT,
       subtype        TEXT,
-      type           TEXT
+      type           TEXT,
+      user_id        INTEGER               -- owning Django user
     );
 
     CREATE TABLE IF NOT EXISTS transactions (
       transaction_id   TEXT PRIMARY KEY,
       account_id       TEXT NOT NULL,
-      amount           REAL NOT NULL,
+      amount           REAL NOT NULL,        -- as received; sum amount_cents instead
       date             TEXT NOT NULL,
       name             TEXT,
       merchant_name    TEXT,
       payment_channel  TEXT,
+      amount_cents     INTEGER NOT NULL DEFAULT 0,
+      primary_category TEXT,                 -- first (top-level) category
+      category_path    TEXT,                 -- all categories, ' / '-joined in idx order
+      day_num          INTEGER,              -- date as date.toordinal()
+      week             INTEGER,              -- Monday-based week number, (day_num - 1) / 7
+      month            INTEGER,              -- YYYYMM
+      user_id          INTEGER,              -- accounts.user_id, copied for (user_id, ...) indexes
       FOREIGN KEY (account_id) REFERENCES accounts(account_id) ON DELETE CASCADE
     );
 
@@ -36,7 +76,10 @@ def ensure_schema(cur):
     CREATE TABLE IF NOT EXISTS items (
       item_id         TEXT PRIMARY KEY,
       institution_id  TEXT,
-      webhook         TEXT
+      webhook         TEXT,
+      access_token    TEXT,
+      cursor          TEXT,   -- Plaid /transactions/sync next_cursor; NULL = full history
+      user_id         INTEGER -- Django user who linked the item
     );
 
     CREATE TABLE IF NOT EXISTS meta (
@@ -44,9 +87,49 @@ def ensure_schema(cur):
       total_transactions INTEGER
     );
 
+    -- category dictionary; transaction_categories.category_id points here
+    CREATE TABLE IF NOT EXISTS categories (
+      id    INTEGER PRIMARY KEY,
+      name  TEXT NOT NULL UNIQUE
+    );
+
+    -- goal text ("Food") -> categories whose name contains it, resolved once per
+    -- pattern (wallet/categories.py); the trigger maps categories added later
+    CREATE TABLE IF NOT EXISTS category_patterns (
+      pattern  TEXT PRIMARY KEY
+    );
+    CREATE TABLE IF NOT EXISTS category_pattern_matches (
+      pattern      TEXT NOT NULL,
+      category_id  INTEGER NOT NULL,
+      PRIMARY KEY (pattern, category_id)
+    ) WITHOUT ROWID;
+    CREATE TRIGGER IF NOT EXISTS categories_match_patterns AFTER INSERT ON categories
+    BEGIN
+      INSERT OR IGNORE INTO category_pattern_matches (pattern, category_id)
+      SELECT pattern, NEW.id FROM category_patterns WHERE NEW.name LIKE '%' || pattern || '%';
+    END;
+
     CREATE INDEX IF NOT EXISTS idx_transactions_account ON transactions(account_id);
     CREATE INDEX IF NOT EXISTS idx_transactions_date   ON transactions(date);
+    """ + DAILY_SPEND_DDL)
+
+    # items created before cursor-based sync existed
+    _add_missing_columns(cur, "items", {"access_token": "TEXT", "cursor": "TEXT", "user_id": "INTEGER"})
+    _add_missing_columns(cur, "accounts", {"user_id": "INTEGER"})
+
+    _add_missing_columns(cur, "transaction_categories", {"category_id": "INTEGER"})
+    _add_missing_columns(cur, "transactions", {"amount_cents": "INTEGER NOT NULL DEFAULT 0",
+                                               "primary_category": "TEXT", "category_path": "TEXT",
+                                               "day_num": "INTEGER", "week": "INTEGER", "month": "INTEGER",
+                                               "user_id": "INTEGER"})
+    cur.executescript("""
+    CREATE INDEX IF NOT EXISTS idx_transactions_day           ON transactions(day_num);
+    CREATE INDEX IF NOT EXISTS idx_transactions_user_day      ON transactions(user_id, day_num);
+    CREATE INDEX IF NOT EXISTS idx_transactions_user_category ON transactions(user_id, primary_category);
+    CREATE INDEX IF NOT EXISTS idx_accounts_user              ON accounts(user_id);
     """)
+    cur.execute("""CREATE INDEX IF NOT EXISTS idx_transaction_categories_category
+                   ON transaction_categories(category_id, transaction_id)""")
 
     # Minimal cards table used by your views (no extra unique constraints)
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cards'")
@@ -59,16 +142,101 @@ def ensure_schema(cur):
           issuer            TEXT,
           annual_fee        REAL,
           type              TEXT,   -- "credit" / "debit" / etc
-          base_reward_rate  REAL
+          base_reward_rate  REAL,
+          user_id           INTEGER -- NULL for catalog cards (load_perks_to_sqlite)
         );
         """)
     else:
         # Add plaid_account_id if missing (older schemas)
-        cur.execute("PRAGMA table_info(cards)")
-        cols = {row[1] for row in cur.fetchall()}
-        if "plaid_account_id" not in cols:
+        _add_missing_columns(cur, "cards", {"plaid_account_id": "TEXT", "user_id": "INTEGER"})
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_user ON cards(user_id)")
+
+    # one-off backfills for rows written before a schema change
+    version = schema_version(cur)
+    rebuild_rollup = False
+    if version < 1:
+        cur.execute("INSERT OR IGNORE INTO categories (name) SELECT DISTINCT category FROM transaction_categories")
+        cur.execute("""
+            UPDATE transaction_categories
+               SET category_id = (SELECT id FROM categories WHERE name = transaction_categories.category)
+             WHERE category_id IS NULL
+        """)
+    if version < 3:
+        # money moved to integer cents
+        cur.execute("UPDATE transactions SET amount_cents = CAST(ROUND(amount * 100) AS INTEGER)")
+        rebuild_rollup = True
+    if version < 4:
+        # denormalized category columns; daily_spend categories become primary-only
+        cur.execute("""
+            UPDATE transactions SET
+              primary_category = (SELECT category FROM transaction_categories c
+                                   WHERE c.transaction_id = transactions.transaction_id
+                                   ORDER BY idx LIMIT 1),
+              category_path = (SELECT GROUP_CONCAT(category, ' / ') FROM
+                                 (SELECT category FROM transaction_categories c
+                                   WHERE c.transaction_id = transactions.transaction_id
+                                   ORDER BY idx))
+        """)
+        rebuild_rollup = True
+    if version < 5:
+        # integer day/week/month buckets; julianday('0001-01-01') - 1 = 1721424.5
+        cur.execute("""
+            UPDATE transactions SET
+              day_num = CAST(julianday(date) - 1721424.5 AS INTEGER),
+              week    = (CAST(julianday(date) - 1721424.5 AS INTEGER) - 1) / 7,
+              month   = CAST(strftime('%Y%m', date) AS INTEGER)
+        """)
+        rebuild_rollup = True
+    if version < 6:
+        # per-user scoping: everything loaded so far belongs to the default user
+        cur.execute("UPDATE accounts SET user_id = ? WHERE user_id IS NULL", (DEFAULT_USER_ID,))
+        cur.execute("UPDATE items SET user_id = ? WHERE user_id IS NULL", (DEFAULT_USER_ID,))
+        cur.execute("""
+            UPDATE transactions
+               SET user_id = (SELECT user_id FROM accounts a WHERE a.account_id = transactions.account_id)
+        """)
+        cur.execute("""
+            UPDATE cards
+               SET user_id = (SELECT user_id FROM accounts a WHERE a.account_id = cards.plaid_account_id)
+             WHERE plaid_account_id IS NOT NULL
+        """)
+        rebuild_rollup = True
+    if rebuild_rollup:
+        cur.execute("DROP TABLE IF EXISTS daily_spend")
+        cur.executescript(DAILY_SPEND_DDL)
+        cur.execute("SELECT DISTINCT date FROM transactions")
+        refresh_daily_spend(cur, [r[0] for r in cur.fetchall()])
+    if version < SCHEMA_VERSION:
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def _category_columns(categories):
+    """(primary_category, category_path) for a transaction's category list."""
+    categories = [c for c in (categories or []) if c]
+    if not categories:
+        return None, None
+    return categories[0], " / ".join(categories)
+
+def _day_buckets(day):
+    """(day_num, week, month) for an ISO date: ordinal day, Monday-based week, YYYYMM."""
+    try:
+        d = date.fromisoformat(str(day)[:10])
+    except ValueError:
+        return None, None, None
+    n = d.toordinal()   # 0001-01-01 is ordinal 1, a Monday
+    return n, (n - 1) // 7, d.year * 100 + d.month
+
+def schema_version(cur):
+    cur.execute("PRAGMA user_version")
+    return cur.fetchone()[0]
+
+def _add_missing_columns(cur, table, columns):
+    """ALTER TABLE ... ADD COLUMN for each {name: type} the table doesn't have yet."""
+    cur.execute(f"PRAGMA table_info({table})")
+    cols = {row[1] for row in cur.fetchall()}
+    for name, col_type in columns.items():
+        if name not in cols:
             try:
-                cur.execute("ALTER TABLE cards ADD COLUMN plaid_account_id TEXT")
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
             except sqlite3.OperationalError:
                 pass
 
@@ -90,16 +258,17 @@ def _guess_issuer(name: str) -> str:
     m = re.split(r"\s*[-|–]\s*| card| credit", name, flags=re.I)
     return (m[0] or "").strip()
 
-def _upsert_card_from_account(cur, a):
+def _upsert_card_from_account(cur, a, user_id):
     """
     Mirror Plaid credit accounts into cards.
     - Update by plaid_account_id if already linked.
     - Else try insert.
     - If insert conflicts on (card_name, issuer) UNIQUE in your DB, just update that row to link plaid_account_id.
+    Returns True if cards changed (the card catalog's version is bumped for it).
     """
     acc_type = (a.get("type") or "").lower()
     if acc_type != "credit":
-        return
+        return False
 
     plaid_account_id = a.get("account_id")
     card_name = a.get("official_name") or a.get("name") or f"{a.get('type','').title()} {a.get('subtype','')}".strip()
@@ -108,28 +277,37 @@ def _upsert_card_from_account(cur, a):
     base_rate  = 1.0
     card_type  = "credit"
 
-    # 1) Update by plaid_account_id
+    # 1) Update by plaid_account_id (an unchanged card is left alone)
     cur.execute("""
-        UPDATE cards
-           SET card_name=?, issuer=?, annual_fee=?, type=?, base_reward_rate=?
+        SELECT card_name, issuer, annual_fee, type, base_reward_rate, user_id
+          FROM cards
          WHERE plaid_account_id IS NOT NULL AND plaid_account_id=?
-    """, (card_name, issuer, annual_fee, card_type, base_rate, plaid_account_id))
-    if cur.rowcount:
-        return
+    """, (plaid_account_id,))
+    linked = cur.fetchone()
+    if linked == (card_name, issuer, annual_fee, card_type, base_rate, user_id):
+        return False
+    if linked is not None:
+        cur.execute("""
+            UPDATE cards
+               SET card_name=?, issuer=?, annual_fee=?, type=?, base_reward_rate=?, user_id=?
+             WHERE plaid_account_id IS NOT NULL AND plaid_account_id=?
+        """, (card_name, issuer, annual_fee, card_type, base_rate, user_id, plaid_account_id))
+        return True
 
     # 2) Try insert (no extra unique constraints here)
     try:
         cur.execute("""
-            INSERT INTO cards (plaid_account_id, card_name, issuer, annual_fee, type, base_reward_rate)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (plaid_account_id, card_name, issuer, annual_fee, card_type, base_rate))
+            INSERT INTO cards (plaid_account_id, card_name, issuer, annual_fee, type, base_reward_rate, user_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (plaid_account_id, card_name, issuer, annual_fee, card_type, base_rate, user_id))
     except sqlite3.IntegrityError:
         # 3) If your existing schema enforces UNIQUE(card_name, issuer), link it
         cur.execute("""
             UPDATE cards
-               SET plaid_account_id=?, annual_fee=?, type=?, base_reward_rate=?
+               SET plaid_account_id=?, annual_fee=?, type=?, base_reward_rate=?, user_id=?
              WHERE card_name=? AND issuer=?
-        """, (plaid_account_id, annual_fee, card_type, base_rate, card_name, issuer))
+        """, (plaid_account_id, annual_fee, card_type, base_rate, user_id, card_name, issuer))
+    return True
 
 # seed a single deterministic tx per qualifying account (idempotent)
 SEED_RULES = [
@@ -153,120 +331,423 @@ def _seed_date_for_account(acc_id: str, seed_name: str, days_back: int = 14) ->
     offset = int(hashlib.md5(key).hexdigest(), 16) % max(1, days_back)
     return (base - timedelta(days=offset)).isoformat()
 
-def _seed_transactions_from_accounts(cur, accounts, seed_on_date=None, days_back: int = 14):
+def seed_transactions_from_accounts(cur, accounts, seed_on_date=None, days_back: int = 14, dirty_days=None):
+    """
+    Set-based: classify every account against SEED_RULES in one pass (first
+    matching rule wins), check which seed ids already exist with one query, then
+    bulk-insert the missing seeds and their categories. Returns seeds inserted.
+    """
     # If a specific seed_on_date is provided, use it; otherwise spread across past N days.
     fixed_date = seed_on_date
 
+    seeds = {}
     for a in accounts:
         acc_id = a.get("account_id")
         if not acc_id:
             continue
+        rule = next((r for r in SEED_RULES if r["match"](a)), None)
+        if rule:
+            seeds[f"seed::{acc_id}::{rule['name']}"] = (acc_id, rule)
+    if not seeds:
+        return 0
 
-        for rule in SEED_RULES:
-            if rule["match"](a):
-                txid = f"seed::{acc_id}::{rule['name']}"
-                # Only skip if THIS seed already exists; do NOT skip just because other tx exist
-                cur.execute("SELECT 1 FROM transactions WHERE transaction_id=? LIMIT 1", (txid,))
-                if cur.fetchone():
-                    break
-
-                tx_date = fixed_date or _seed_date_for_account(acc_id, rule["name"], days_back=days_back)
-                cur.execute("""
-                  INSERT INTO transactions
-                    (transaction_id, account_id, amount, date, name, merchant_name, payment_channel)
-                  VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (txid, acc_id, float(rule["amount"]), tx_date,
-                      rule["name"], rule["merchant"], rule["payment_channel"]))
-
-                # categories for this seed
-                for i, cat in enumerate(rule["categories"]):
-                    cur.execute("""
-                      INSERT OR IGNORE INTO transaction_categories (transaction_id, idx, category)
-                      VALUES (?, ?, ?)
-                    """, (txid, i, cat))
-                break
-
-def load(json_path, db_path):
-    if not os.path.exists(json_path):
-        raise SystemExit(f"JSON not found: {json_path}")
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    ensure_schema(cur)
+    # Only skip if THIS seed already exists; do NOT skip just because other tx exist
+    existing = set()
+    for chunk in _chunks(list(seeds), IN_CHUNK):
+        cur.execute(
+            f"SELECT transaction_id FROM transactions WHERE transaction_id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        )
+        existing.update(row[0] for row in cur.fetchall())
+    missing = [(txid, acc_id, rule) for txid, (acc_id, rule) in seeds.items() if txid not in existing]
+
+    rows = []
+    for txid, acc_id, rule in missing:
+        day = fixed_date or _seed_date_for_account(acc_id, rule["name"], days_back=days_back)
+        rows.append((txid, acc_id, float(rule["amount"]), day,
+                     rule["name"], rule["merchant"], rule["payment_channel"], to_cents(rule["amount"]),
+                     *_category_columns(rule["categories"]), *_day_buckets(day), acc_id))
+    cur.executemany("""
+      INSERT INTO transactions
+        (transaction_id, account_id, amount, date, name, merchant_name, payment_channel, amount_cents,
+         primary_category, category_path, day_num, week, month, user_id)
+      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, (SELECT user_id FROM accounts WHERE account_id = ?))
+    """, rows)
+
+    # categories for these seeds
+    cat_ids = category_ids(cur, [cat for _, _, rule in missing for cat in rule["categories"]])
+    cur.executemany("""
+      INSERT OR IGNORE INTO transaction_categories (transaction_id, idx, category, category_id)
+      VALUES (?, ?, ?, ?)
+    """, [(txid, i, cat, cat_ids[cat])
+          for txid, _, rule in missing
+          for i, cat in enumerate(rule["categories"])])
+    _touch_days(cur, dirty_days, {r[3] for r in rows})
+    return len(missing)
+
+# load_manifest key for the files this loader reads
+LOADER_NAME = "load_bills_to_sqlite"
+
+# rows per executemany() batch / ids per "IN (...)" (SQLite caps bound params at 999 on old builds)
+BATCH_SIZE = 5000
+IN_CHUNK = 500
+
+# top-level arrays load() understands; /transactions/sync dumps use added/modified/removed
+STREAM_KEYS = ("accounts", "transactions", "added", "modified", "removed")
+
+def _chunks(seq, n):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def _batched(iterable, n):
+    """Like _chunks, but for iterators (e.g. json_stream) -- holds at most n items."""
+    batch = []
+    for x in iterable:
+        batch.append(x)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def refresh_daily_spend(cur, days):
+    """
+    Re-aggregate daily_spend for the given ISO days from transactions (+ categories)
+    and bump the spending data_version of every user with rows on those days.
+    """
+    day_nums = sorted({_day_buckets(d)[0] for d in days if d} - {None})
+    users = set()
+    for chunk in _chunks(day_nums, IN_CHUNK // 2):   # each chunk is bound twice below
+        marks = ",".join("?" * len(chunk))
+        users.update(_rollup_users(cur, chunk))
+        cur.execute(f"DELETE FROM daily_spend WHERE day_num IN ({marks})", chunk)
+        cur.execute(f"""
+          INSERT INTO daily_spend (user_id, day_num, account_id, category_id, day, week, month,
+                                   total_cents, count)
+          SELECT user_id, day_num, account_id, 0, date, week, month, SUM(amount_cents), COUNT(*)
+            FROM transactions
+           WHERE day_num IN ({marks}) AND user_id IS NOT NULL
+           GROUP BY user_id, day_num, account_id
+          UNION ALL
+          SELECT t.user_id, t.day_num, t.account_id, k.id, t.date, t.week, t.month,
+                 SUM(t.amount_cents), COUNT(*)
+            FROM transactions t
+            JOIN categories k ON k.name = t.primary_category
+           WHERE t.day_num IN ({marks}) AND t.user_id IS NOT NULL
+           GROUP BY t.user_id, t.day_num, t.account_id, k.id
+        """, chunk + chunk)
+        users.update(_rollup_users(cur, chunk))
+    for user_id in sorted(users):
+        data_version.bump(cur, data_version.spending_key(user_id))
+
+def _rollup_users(cur, day_nums):
+    cur.execute(f"SELECT DISTINCT user_id FROM daily_spend WHERE day_num IN ({','.join('?' * len(day_nums))})",
+                day_nums)
+    return [r[0] for r in cur.fetchall()]
+
+def _touch_days(cur, dirty_days, days):
+    """Refresh the rollup for days now, or collect them when the caller batches (dirty_days set)."""
+    if dirty_days is None:
+        refresh_daily_spend(cur, days)
+    else:
+        dirty_days.update(days)
+
+def _days_of(cur, transaction_ids):
+    """Dates currently stored for these transaction ids."""
+    days = set()
+    for chunk in _chunks(list(transaction_ids), IN_CHUNK):
+        cur.execute(f"SELECT DISTINCT date FROM transactions WHERE transaction_id IN ({','.join('?' * len(chunk))})",
+                    chunk)
+        days.update(r[0] for r in cur.fetchall())
+    return days
+
+def category_ids(cur, names):
+    """{name: categories.id} for names, adding any the dictionary doesn't have yet."""
+    names = list({n for n in names if n})
+    cur.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)", [(n,) for n in names])
+    ids = {}
+    for chunk in _chunks(names, IN_CHUNK):
+        cur.execute(f"SELECT name, id FROM categories WHERE name IN ({','.join('?' * len(chunk))})", chunk)
+        ids.update(cur.fetchall())
+    return ids
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def _owners(cur, account_ids):
+    """{account_id: user_id} as currently stored."""
+    owners = {}
+    for chunk in _chunks(list(account_ids), IN_CHUNK):
+        cur.execute(f"SELECT account_id, user_id FROM accounts WHERE account_id IN ({','.join('?' * len(chunk))})",
+                    chunk)
+        owners.update(cur.fetchall())
+    return owners
 
-    # --- ACCOUNTS (upsert by PK only; account_id) ---
-    accounts = data.get("accounts", [])
+def upsert_accounts(cur, accounts, user_id=DEFAULT_USER_ID, reassign=False, dirty_days=None):
+    """
+    Upsert accounts by account_id and mirror credit accounts into cards. A new
+    account belongs to user_id unless the dict carries its own "user_id"; its
+    transactions inherit it. An account that already has an owner keeps it
+    unless reassign=True, which also moves its transactions (and their
+    daily_spend days, see _touch_days) to the new owner.
+    """
+    rows = [(a.get("account_id"), a.get("mask"), a.get("name"), a.get("official_name"),
+             a.get("subtype"), a.get("type"), a.get("user_id") or user_id) for a in accounts]
+    ids = [r[0] for r in rows]
+    before = _owners(cur, ids) if reassign else {}
+    owner = "excluded.user_id" if reassign else "COALESCE(accounts.user_id, excluded.user_id)"
+    cur.executemany(f"""
+      INSERT INTO accounts (account_id, mask, name, official_name, subtype, type, user_id)
+      VALUES (?, ?, ?, ?, ?, ?, ?)
+      ON CONFLICT(account_id) DO UPDATE SET
+        mask=excluded.mask,
+        name=excluded.name,
+        official_name=excluded.official_name,
+        subtype=excluded.subtype,
+        type=excluded.type,
+        user_id={owner}
+    """, rows)
+    owners = _owners(cur, ids)
+
+    moved = [acc for acc, old in before.items() if old is not None and old != owners.get(acc)]
+    for chunk in _chunks(moved, IN_CHUNK):
+        marks = ",".join("?" * len(chunk))
+        cur.execute(f"SELECT DISTINCT date FROM transactions WHERE account_id IN ({marks})", chunk)
+        days = {r[0] for r in cur.fetchall()}
+        cur.execute(f"""
+            UPDATE transactions
+               SET user_id = (SELECT user_id FROM accounts a WHERE a.account_id = transactions.account_id)
+             WHERE account_id IN ({marks})
+        """, chunk)
+        _touch_days(cur, dirty_days, days)
+
+    # cards follow the account's stored owner, not whoever loaded it last
+    mirrored = False
     for a in accounts:
-        cur.execute("""
-          INSERT INTO accounts (account_id, mask, name, official_name, subtype, type)
-          VALUES (:account_id, :mask, :name, :official_name, :subtype, :type)
-          ON CONFLICT(account_id) DO UPDATE SET
-            mask=excluded.mask,
-            name=excluded.name,
-            official_name=excluded.official_name,
-            subtype=excluded.subtype,
-            type=excluded.type
-        """, a)
-
-        # mirror Plaid credit accounts into cards
-        _upsert_card_from_account(cur, a)
-
-    # --- REAL TRANSACTIONS from JSON (upsert by transaction_id only) ---
-    for t in data.get("transactions", []):
-        cur.execute("""
-          INSERT INTO transactions (transaction_id, account_id, amount, date, name, merchant_name, payment_channel)
-          VALUES (?, ?, ?, ?, ?, ?, ?)
-          ON CONFLICT(transaction_id) DO UPDATE SET
-            account_id      = excluded.account_id,
-            amount          = excluded.amount,
-            date            = excluded.date,
-            name            = excluded.name,
-            merchant_name   = excluded.merchant_name,
-            payment_channel = excluded.payment_channel
-        """, (
-            t.get("transaction_id"),
-            t.get("account_id"),
-            float(t.get("amount", 0)),
-            t.get("date"),
-            t.get("name"),
-            t.get("merchant_name"),
-            t.get("payment_channel"),
-        ))
-
-        # categories for this tx (by (transaction_id, idx) only)
-        cur.execute("DELETE FROM transaction_categories WHERE transaction_id = ?", (t.get("transaction_id"),))
-        for i, cat in enumerate(t.get("category", []) or []):
-            cur.execute("""
-              INSERT OR IGNORE INTO transaction_categories (transaction_id, idx, category)
-              VALUES (?, ?, ?)
-            """, (t["transaction_id"], i, cat))
-
-    # --- SEED tx if accounts imply flows; no account-id based skipping ---
-    _seed_transactions_from_accounts(cur, accounts)
-
-    # --- ITEM / META (simple writes) ---
-    item = data.get("item", {})
+        mirrored |= _upsert_card_from_account(cur, a, owners.get(a.get("account_id")))
+    if mirrored:
+        data_version.bump(cur, data_version.CARD_CATALOG)
+    return len(accounts)
+
+def upsert_transactions(cur, txs, dirty_days=None):
+    """
+    Upsert a batch of transactions by transaction_id and replace their categories
+    set-wise (one DELETE ... IN per chunk, one executemany for the new rows).
+    daily_spend is refreshed for every day touched (old and new dates) unless
+    dirty_days is given, in which case those days are added to it instead.
+    Returns the number of transactions written.
+    """
+    rows = [(
+        t.get("transaction_id"),
+        t.get("account_id"),
+        float(t.get("amount", 0)),
+        t.get("date"),
+        t.get("name"),
+        t.get("merchant_name"),
+        t.get("payment_channel"),
+        to_cents(t.get("amount", 0)),
+        *_category_columns(t.get("category")),
+        *_day_buckets(t.get("date")),
+        t.get("account_id"),
+    ) for t in txs]
+    if not rows:
+        return 0
+    days = _days_of(cur, [r[0] for r in rows]) | {r[3] for r in rows}
+
+    cur.executemany("""
+      INSERT INTO transactions (transaction_id, account_id, amount, date, name, merchant_name, payment_channel,
+                                amount_cents, primary_category, category_path, day_num, week, month, user_id)
+      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, (SELECT user_id FROM accounts WHERE account_id = ?))
+      ON CONFLICT(transaction_id) DO UPDATE SET
+        account_id      = excluded.account_id,
+        amount          = excluded.amount,
+        amount_cents    = excluded.amount_cents,
+        date            = excluded.date,
+        name            = excluded.name,
+        merchant_name   = excluded.merchant_name,
+        payment_channel = excluded.payment_channel,
+        primary_category = excluded.primary_category,
+        category_path   = excluded.category_path,
+        day_num         = excluded.day_num,
+        week            = excluded.week,
+        month           = excluded.month,
+        user_id         = excluded.user_id
+    """, rows)
+
+    # categories for these tx (by (transaction_id, idx) only)
+    ids = [r[0] for r in rows]
+    for chunk in _chunks(ids, IN_CHUNK):
+        cur.execute(
+            f"DELETE FROM transaction_categories WHERE transaction_id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        )
+    cat_ids = category_ids(cur, [cat for t in txs for cat in (t.get("category", []) or [])])
+    cur.executemany("""
+      INSERT OR IGNORE INTO transaction_categories (transaction_id, idx, category, category_id)
+      VALUES (?, ?, ?, ?)
+    """, [(t["transaction_id"], i, cat, cat_ids.get(cat))
+          for t in txs
+          for i, cat in enumerate(t.get("category", []) or [])])
+    _touch_days(cur, dirty_days, days)
+    return len(rows)
+
+def remove_transactions(cur, transaction_ids, dirty_days=None):
+    """Delete transactions together with their categories. Returns rows deleted."""
+    ids = [tid for tid in transaction_ids if tid]
+    days = _days_of(cur, ids)
+    removed = 0
+    for chunk in _chunks(ids, IN_CHUNK):
+        marks = ",".join("?" * len(chunk))
+        cur.execute(f"DELETE FROM transaction_categories WHERE transaction_id IN ({marks})", chunk)
+        cur.execute(f"DELETE FROM transactions WHERE transaction_id IN ({marks})", chunk)
+        removed += cur.rowcount
+    _touch_days(cur, dirty_days, days)
+    return removed
+
+def apply_transaction_deltas(cur, added=(), modified=(), removed_ids=()):
+    """
+    Apply one Plaid /transactions/sync delta, keyed by transaction_id:
+    upsert modified rows, delete removed ids (with their categories), insert added rows,
+    then refresh daily_spend once for every day touched.
+    Returns {"added", "modified", "removed"} row counts.
+    """
+    days = set()
+    n_modified = upsert_transactions(cur, modified, dirty_days=days)
+    n_removed = remove_transactions(cur, removed_ids, dirty_days=days)
+    n_added = upsert_transactions(cur, added, dirty_days=days)
+    refresh_daily_spend(cur, days)
+    return {"added": n_added, "modified": n_modified, "removed": n_removed}
+
+def save_item_meta(cur, item, request_id, total_transactions, user_id=DEFAULT_USER_ID, reassign=False):
+    # access_token/cursor only come from plaid_pull; a plain bills.json must not clear them.
+    # The item keeps the user who linked it unless reassign=True.
     if item and item.get("item_id"):
-        cur.execute("""
-          INSERT INTO items (item_id, institution_id, webhook)
-          VALUES (:item_id, :institution_id, :webhook)
+        owner = "excluded.user_id" if reassign else "COALESCE(items.user_id, excluded.user_id)"
+        cur.execute(f"""
+          INSERT INTO items (item_id, institution_id, webhook, access_token, cursor, user_id)
+          VALUES (?, ?, ?, ?, ?, ?)
           ON CONFLICT(item_id) DO UPDATE SET
             institution_id = excluded.institution_id,
-            webhook        = excluded.webhook
-        """, item)
+            webhook        = excluded.webhook,
+            access_token   = COALESCE(excluded.access_token, items.access_token),
+            cursor         = COALESCE(excluded.cursor, items.cursor),
+            user_id        = {owner}
+        """, (item.get("item_id"), item.get("institution_id"), item.get("webhook"),
+              item.get("access_token"), item.get("cursor"), item.get("user_id") or user_id))
 
     cur.execute("DELETE FROM meta")
     cur.execute("INSERT INTO meta (request_id, total_transactions) VALUES (?, ?)",
-                (data.get("request_id"), data.get("total_transactions")))
+                (request_id, total_transactions))
 
-    conn.commit()
-    conn.close()
+def load(json_path, db_path, batch_size=BATCH_SIZE, force=False, user_id=DEFAULT_USER_ID, reassign=False):
+    """
+    Stream a bills/Plaid JSON file into SQLite in ONE write transaction.
+    The accounts/transactions arrays are walked element by element and written
+    batch_size rows per executemany(), so memory stays flat for any file size.
+    Dumps in /transactions/sync shape may also carry "added" / "modified"
+    (upserted) and "removed" (ids or {"transaction_id": ...}, deleted) arrays.
+    Any other top-level array raises ValueError (and nothing is written) rather
+    than being dropped unnoticed.
+    A file whose content matches what load_manifest recorded for it is skipped
+    without taking the write lock (status "skipped, unchanged") unless force=True.
+    New accounts, items and (through their account) transactions are owned by
+    user_id; ones that already have an owner keep it unless reassign=True
+    (which also reloads an unchanged file).
+    Returns {"status", "accounts", "transactions", "removed", "seconds", "rows_per_sec"}.
+    """
+    if not os.path.exists(json_path):
+        raise SystemExit(f"JSON not found: {json_path}")
+    started = time.perf_counter()
+
+    # isolation_level=None: we open/commit the transaction ourselves
+    conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE, isolation_level=None)
+    cur = conn.cursor()
+
+    unchanged, fingerprint = load_manifest.check(cur, LOADER_NAME, json_path)
+    if unchanged and not (force or reassign):
+        if schema_version(cur) < SCHEMA_VERSION:
+            ensure_schema(cur)   # nothing new to load, but still migrate the schema
+        conn.close()
+        return {"status": load_manifest.SKIPPED, "accounts": 0, "transactions": 0, "removed": 0,
+                "seconds": round(time.perf_counter() - started, 3), "rows_per_sec": 0}
+
+    ensure_schema(cur)
+
+    n_accounts = written = removed = 0
+    item, request_id, total_transactions = {}, None, None
+    days = set()   # daily_spend days to re-aggregate before COMMIT
+
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        # transactions may come before accounts in the file; check FKs at COMMIT
+        cur.execute("PRAGMA defer_foreign_keys = ON")
+
+        with open(json_path, "r", encoding="utf-8") as f:
+            for key, value in iter_members(f, stream_keys=STREAM_KEYS):
+                if key == "accounts":
+                    # --- ACCOUNTS (upsert by PK only; account_id) ---
+                    for batch in _batched(value, batch_size):
+                        n_accounts += upsert_accounts(cur, batch, user_id, reassign, dirty_days=days)
+                        # --- SEED tx if accounts imply flows; no account-id based skipping ---
+                        seed_transactions_from_accounts(cur, batch, dirty_days=days)
+                elif key in ("transactions", "added", "modified"):
+                    # --- REAL TRANSACTIONS from JSON (upsert by transaction_id only) ---
+                    for batch in _batched(value, batch_size):
+                        written += upsert_transactions(cur, batch, dirty_days=days)
+                elif key == "removed":
+                    for batch in _batched(value, batch_size):
+                        removed += remove_transactions(
+                            cur, [r.get("transaction_id") if isinstance(r, dict) else r for r in batch],
+                            dirty_days=days,
+                        )
+                elif key == "item":
+                    item = value or {}
+                elif key == "request_id":
+                    request_id = value
+                elif key == "total_transactions":
+                    total_transactions = value
+                elif isinstance(value, list):
+                    raise ValueError(f"{json_path}: unknown array {key!r} (expected one of {', '.join(STREAM_KEYS)})")
+
+        # transactions listed before their account got no owner when written
+        cur.execute("""
+            UPDATE transactions
+               SET user_id = (SELECT user_id FROM accounts a WHERE a.account_id = transactions.account_id)
+             WHERE user_id IS NULL
+        """)
+
+        # --- ROLLUP for every day this file touched ---
+        refresh_daily_spend(cur, days)
+
+        # --- ITEM / META (simple writes) ---
+        save_item_meta(cur, item, request_id, total_transactions, user_id, reassign)
+        load_manifest.record(cur, LOADER_NAME, json_path, fingerprint)
+        data_version.bump(cur, data_version.INGEST)
+
+        cur.execute("COMMIT")
+    except BaseException:
+        cur.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        "status": load_manifest.LOADED,
+        "accounts": n_accounts,
+        "transactions": written,
+        "removed": removed,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(written / seconds) if seconds > 0 else written,
+    }
 
 if __name__ == "__main__":
-    # Usage: python load_bills_to_sqlite.py /path/to/bills.json /path/to/db.sqlite3
-    json_path = sys.argv[1] if len(sys.argv) > 1 else "bills.json"
-    db_path   = sys.argv[2] if len(sys.argv) > 2 else "db.sqlite3"
-    load(json_path, db_path)
-    print(f"Loaded {json_path} into {db_path}")
+    # Usage: python load_bills_to_sqlite.py /path/to/bills.json /path/to/ingest.sqlite3 [--force] [--user-id=N [--reassign]]
+    args = [a for a in sys.argv[1:] if a not in ("--force", "--reassign") and not a.startswith("--user-id=")]
+    json_path = args[0] if len(args) > 0 else "bills.json"
+    db_path   = args[1] if len(args) > 1 else "ingest.sqlite3"
+    user_id = next((int(a.split("=", 1)[1]) for a in sys.argv[1:] if a.startswith("--user-id=")), DEFAULT_USER_ID)
+    stats = load(json_path, db_path, force="--force" in sys.argv, user_id=user_id,
+                 reassign="--reassign" in sys.argv)
+    if stats["status"] == load_manifest.SKIPPED:
+        print(f"Skipped {json_path}: unchanged since last load (use --force to reload)")
+    else:
+        print(f"Loaded {json_path} into {db_path}: "
+              f"{stats['transactions']} transactions in {stats['seconds']}s ({stats['rows_per_sec']} rows/s)")
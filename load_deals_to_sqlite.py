@@ -1,6 +1,15 @@
-import json, sqlite3, sys, os
+import sqlite3, sys, os
 from typing import Any, Dict, List
 
+import data_version, load_manifest, sqlite_profile
+from json_stream import iter_items
+
+# load_manifest key for the files this loader reads
+LOADER_NAME = "load_deals_to_sqlite"
+
+# deal_type values parse_deals writes; other deals rows (new_load_data's featured offers) aren't ours
+DEAL_TYPES = ("welcome", "perk", "category")
+
 def ensure_schema(cur: sqlite3.Cursor):
     cur.executescript("""
     PRAGMA foreign_keys = ON;
@@ -26,9 +35,14 @@ def ensure_schema(cur: sqlite3.Cursor):
       annual_fee       REAL,
       type             TEXT,
       base_reward_rate REAL,
+      user_id          INTEGER,   -- NULL: catalog card; set for cards mirrored from a user's accounts
       UNIQUE(card_name, issuer)
     );
     """)
+    # cards created before per-user scoping
+    cur.execute("PRAGMA table_info(cards)")
+    if "user_id" not in {row[1] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE cards ADD COLUMN user_id INTEGER")
 
 def upsert_card(cur: sqlite3.Cursor, c: Dict[str, Any]) -> int:
     card_name = c.get("card_name")
@@ -140,33 +154,45 @@ def parse_deals(card: Dict[str, Any], card_id: int) -> List[Dict[str, Any]]:
 
     return deals
 
-def load(json_path: str, db_path: str):
+def load(json_path: str, db_path: str, force: bool=False):
     if not os.path.exists(json_path):
         raise SystemExit(f"JSON not found: {json_path}")
 
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE)
     cur = conn.cursor()
-    ensure_schema(cur)
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    items = data if isinstance(data, list) else [data]
+    # Nothing to do if this exact file was already loaded (no write lock taken)
+    unchanged, fingerprint = load_manifest.check(cur, LOADER_NAME, json_path)
+    if unchanged and not force:
+        conn.close()
+        return {"status": load_manifest.SKIPPED}
 
-    cur.execute("DELETE FROM deals")  # Clear existing deals
+    ensure_schema(cur)
 
-    for card in items:
-        card_id = upsert_card(cur, card)
-        for deal in parse_deals(card, card_id):
-            insert_deal(cur, deal)
+    # Clear the deals this loader wrote last time
+    cur.execute(f"DELETE FROM deals WHERE deal_type IN ({','.join('?' * len(DEAL_TYPES))})", DEAL_TYPES)
 
+    # Cards are streamed one at a time so the whole file is never in memory.
+    with open(json_path, "r", encoding="utf-8") as f:
+        for card in iter_items(f):
+            card_id = upsert_card(cur, card)
+            for deal in parse_deals(card, card_id):
+                insert_deal(cur, deal)
+
+    data_version.bump(cur, data_version.CARD_CATALOG)
+    data_version.bump(cur, data_version.INGEST)
+    load_manifest.record(cur, LOADER_NAME, json_path, fingerprint)
     conn.commit()
     conn.close()
+    return {"status": load_manifest.LOADED}
 
 if __name__ == "__main__":
     # Usage:
-    #   python load_deals_to_sqlite.py /path/to/perk_data.json /path/to/db.sqlite3
-    json_path = sys.argv[1] if len(sys.argv) > 1 else "perk_data.json"
-    db_path = sys.argv[2] if len(sys.argv) > 2 else "db.sqlite3"
-    load(json_path, db_path)
+    #   python load_deals_to_sqlite.py /path/to/perk_data.json /path/to/ingest.sqlite3
+    args = [a for a in sys.argv[1:] if a != "--force"]
+    json_path = args[0] if len(args) > 0 else "perk_data.json"
+    db_path = args[1] if len(args) > 1 else "ingest.sqlite3"
+    if load(json_path, db_path, force="--force" in sys.argv)["status"] == load_manifest.SKIPPED:
+        print(f"Skipped {json_path}: unchanged since last load (use --force to reload)")
+        sys.exit(0)
     print(f"Loaded deals from {json_path} into {db_path}")
\ No newline at end of file
@@ -0,0 +1,78 @@
+# load_manifest.py
+"""
+Change detection for the loaders: remember what each loader last loaded from
+each file (size, mtime, sha256) in a small `load_manifest` table so an
+unchanged file can be skipped without taking any write lock.
+
+    unchanged, fp = check(cur, "load_bills_to_sqlite", json_path)
+    if unchanged and not force:
+        return {"status": SKIPPED}
+    ...load...
+    record(cur, "load_bills_to_sqlite", json_path, fp)   # same transaction as the load
+"""
+import hashlib, os, sqlite3
+
+SKIPPED = "skipped, unchanged"
+LOADED = "loaded"
+
+_DIGEST_CHUNK = 1 << 20
+
+
+def ensure_manifest(cur: sqlite3.Cursor):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS load_manifest (
+          source     TEXT PRIMARY KEY,   -- "<loader>:<absolute json path>"
+          size       INTEGER NOT NULL,
+          mtime_ns   INTEGER NOT NULL,
+          sha256     TEXT NOT NULL,
+          loaded_at  TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _source(loader: str, json_path: str) -> str:
+    return f"{loader}:{os.path.abspath(json_path)}"
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_DIGEST_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def check(cur: sqlite3.Cursor, loader: str, json_path: str):
+    """
+    Returns (unchanged, fingerprint). Size+mtime equal to the manifest is taken
+    as unchanged without reading the file; otherwise the sha256 decides.
+    Pass fingerprint to record() after a successful load.
+    """
+    st = os.stat(json_path)
+    try:
+        cur.execute("SELECT size, mtime_ns, sha256 FROM load_manifest WHERE source = ?",
+                    (_source(loader, json_path),))
+        row = cur.fetchone()
+    except sqlite3.OperationalError:
+        row = None   # no manifest table yet
+
+    if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+        return True, (st.st_size, st.st_mtime_ns, row[2])
+
+    digest = file_digest(json_path)
+    unchanged = bool(row) and row[0] == st.st_size and row[2] == digest
+    return unchanged, (st.st_size, st.st_mtime_ns, digest)
+
+
+def record(cur: sqlite3.Cursor, loader: str, json_path: str, fingerprint):
+    ensure_manifest(cur)
+    size, mtime_ns, digest = fingerprint
+    cur.execute("""
+        INSERT INTO load_manifest (source, size, mtime_ns, sha256, loaded_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(source) DO UPDATE SET
+          size      = excluded.size,
+          mtime_ns  = excluded.mtime_ns,
+          sha256    = excluded.sha256,
+          loaded_at = excluded.loaded_at
+    """, (_source(loader, json_path), size, mtime_ns, digest))
@@ -1,7 +1,13 @@
 # load_perks_to_sqlite.py
-import json, sqlite3, sys, os
+import sqlite3, sys, os
 from typing import Any, Dict, List
 
+import data_version, load_manifest, sqlite_profile
+from json_stream import iter_items
+
+# load_manifest key for the files this loader reads
+LOADER_NAME = "load_perks_to_sqlite"
+
 def ensure_schema(cur: sqlite3.Cursor):
     cur.executescript("""
     PRAGMA foreign_keys = ON;
@@ -13,6 +19,7 @@ def ensure_schema(cur: sqlite3.Cursor):
       annual_fee       REAL,
       type             TEXT,
       base_reward_rate REAL,
+      user_id          INTEGER,   -- NULL: catalog card; set for cards mirrored from a user's accounts
       UNIQUE(card_name, issuer)
     );
 
@@ -58,6 +65,11 @@ def ensure_schema(cur: sqlite3.Cursor):
     CREATE INDEX IF NOT EXISTS idx_bonus_categories_card ON bonus_categories(card_id);
     CREATE INDEX IF NOT EXISTS idx_perks_card ON perks(card_id);
     """)
+    # cards created before per-user scoping
+    cur.execute("PRAGMA table_info(cards)")
+    if "user_id" not in {row[1] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE cards ADD COLUMN user_id INTEGER")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cards_user ON cards(user_id)")
 
 def upsert_card(cur: sqlite3.Cursor, c: Dict[str, Any]) -> int:
     # Normalize
@@ -137,35 +149,46 @@ def upsert_current_period(cur: sqlite3.Cursor, card_id: int, period: Dict[str, A
         VALUES (?, ?, ?)
     """, (card_id, period.get("start_date"), period.get("end_date")))
 
-def load(json_path: str, db_path: str):
+def load(json_path: str, db_path: str, force: bool=False):
     if not os.path.exists(json_path):
         raise SystemExit(f"JSON not found: {json_path}")
 
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE)
     cur = conn.cursor()
-    ensure_schema(cur)
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    # Nothing to do if this exact file was already loaded (no write lock taken)
+    unchanged, fingerprint = load_manifest.check(cur, LOADER_NAME, json_path)
+    if unchanged and not force:
+        conn.close()
+        return {"status": load_manifest.SKIPPED}
 
-    # The file is an array of card objects; support dict->list just in case.
-    items = data if isinstance(data, list) else [data]
-
-    for card in items:
-        card_id = upsert_card(cur, card)
-        upsert_welcome_bonus(cur, card_id, card.get("welcome_bonus"))
-        replace_bonus_categories(cur, card_id, card.get("bonus_categories"))
-        replace_perks(cur, card_id, card.get("perks"))
-        upsert_current_period(cur, card_id, card.get("current_period"))
+    ensure_schema(cur)
 
+    # The file is an array of card objects; support dict->list just in case.
+    # Cards are streamed one at a time so the whole file is never in memory.
+    with open(json_path, "r", encoding="utf-8") as f:
+        for card in iter_items(f):
+            card_id = upsert_card(cur, card)
+            upsert_welcome_bonus(cur, card_id, card.get("welcome_bonus"))
+            replace_bonus_categories(cur, card_id, card.get("bonus_categories"))
+            replace_perks(cur, card_id, card.get("perks"))
+            upsert_current_period(cur, card_id, card.get("current_period"))
+
+    data_version.bump(cur, data_version.CARD_CATALOG)
+    data_version.bump(cur, data_version.INGEST)
+    load_manifest.record(cur, LOADER_NAME, json_path, fingerprint)
     conn.commit()
     conn.close()
+    return {"status": load_manifest.LOADED}
 
 if __name__ == "__main__":
     # Usage:
-    #   python load_perks_to_sqlite.py /path/to/perk_data.json /path/to/db.sqlite3
+    #   python load_perks_to_sqlite.py /path/to/perk_data.json /path/to/ingest.sqlite3
     # Defaults to files in current directory.
-    json_path = sys.argv[1] if len(sys.argv) > 1 else "perk_data.json"
-    db_path = sys.argv[2] if len(sys.argv) > 2 else "db.sqlite3"
-    load(json_path, db_path)
+    args = [a for a in sys.argv[1:] if a != "--force"]
+    json_path = args[0] if len(args) > 0 else "perk_data.json"
+    db_path = args[1] if len(args) > 1 else "ingest.sqlite3"
+    if load(json_path, db_path, force="--force" in sys.argv)["status"] == load_manifest.SKIPPED:
+        print(f"Skipped {json_path}: unchanged since last load (use --force to reload)")
+        sys.exit(0)
     print(f"Loaded {json_path} into {db_path}")
@@ -1,31 +1,21 @@
-import json, sqlite3, sys, os
+"""
+Featured merchant offers from deals_data.json (NOBULL, Solgaard, The Bouqs Co.,
+Visible, ...), all on Chase Freedom Flex. They share the deals table with
+load_deals_to_sqlite, which owns the welcome/perk/category rows; a load here
+replaces only this file's deals.
+"""
+import sys, os
 
-def ensure_schema(cur):
-    cur.executescript("""
-    PRAGMA foreign_keys = ON;
-    CREATE TABLE IF NOT EXISTS deals (
-      id              INTEGER PRIMARY KEY AUTOINCREMENT,
-      card_id         INTEGER NOT NULL,
-      deal_type       TEXT NOT NULL,
-      title           TEXT NOT NULL,
-      subtitle        TEXT,
-      benefit         TEXT,
-      expiry_date     TEXT,
-      finer_details   TEXT,
-      issuer          TEXT,
-      card_name       TEXT,
-      FOREIGN KEY (card_id) REFERENCES cards(id) ON DELETE CASCADE
-    );
-    CREATE TABLE IF NOT EXISTS cards (
-      id               INTEGER PRIMARY KEY AUTOINCREMENT,
-      card_name        TEXT NOT NULL,
-      issuer           TEXT,
-      annual_fee       REAL,
-      type             TEXT,
-      base_reward_rate REAL,
-      UNIQUE(card_name, issuer)
-    );
-    """)
+import data_version, load_manifest, sqlite_profile
+from json_stream import iter_items
+from load_deals_to_sqlite import DEAL_TYPES, ensure_schema
+
+# load_manifest key for the files this loader reads
+LOADER_NAME = "new_load_data"
+
+# All deals are for Chase Freedom Flex
+CARD_NAME = "Chase Freedom Flex"
+ISSUER = "Chase"
 
 def get_card_id(cur, card_name, issuer):
     cur.execute("SELECT id FROM cards WHERE card_name=? AND issuer=?", (card_name, issuer))
@@ -58,31 +48,44 @@ def insert_deal(cur, deal, card_id, card_name, issuer):
         card_name,
     ))
 
-def load(json_path, db_path):
+def load(json_path, db_path, force=False):
     if not os.path.exists(json_path):
         raise SystemExit(f"JSON not found: {json_path}")
 
-    conn = sqlite3.connect(db_path)
+    conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE)
     cur = conn.cursor()
-    ensure_schema(cur)
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        deals = json.load(f)
+    # Nothing to do if this exact file was already loaded (no write lock taken)
+    unchanged, fingerprint = load_manifest.check(cur, LOADER_NAME, json_path)
+    if unchanged and not force:
+        conn.close()
+        return {"status": load_manifest.SKIPPED}
 
-    # All deals are for Chase Freedom Flex
-    card_name = "Chase Freedom Flex"
-    issuer = "Chase"
-    card_id = get_card_id(cur, card_name, issuer)
+    ensure_schema(cur)
+
+    card_id = get_card_id(cur, CARD_NAME, ISSUER)
+    # Replace what this file loaded last time (not load_deals_to_sqlite's rows)
+    cur.execute(f"DELETE FROM deals WHERE card_id = ? AND deal_type NOT IN ({','.join('?' * len(DEAL_TYPES))})",
+                (card_id, *DEAL_TYPES))
 
-    for deal in deals:
-        insert_deal(cur, deal, card_id, card_name, issuer)
+    # Deals are streamed one at a time so the whole file is never in memory.
+    with open(json_path, "r", encoding="utf-8") as f:
+        for deal in iter_items(f):
+            insert_deal(cur, deal, card_id, CARD_NAME, ISSUER)
 
+    data_version.bump(cur, data_version.CARD_CATALOG)
+    data_version.bump(cur, data_version.INGEST)
+    load_manifest.record(cur, LOADER_NAME, json_path, fingerprint)
     conn.commit()
     conn.close()
+    return {"status": load_manifest.LOADED}
 
 if __name__ == "__main__":
-    # Usage: python load_chase_deals_to_sqlite.py deals_data.json db.sqlite3
-    json_path = sys.argv[1] if len(sys.argv) > 1 else "deals_data.json"
-    db_path = sys.argv[2] if len(sys.argv) > 2 else "db.sqlite3"
-    load(json_path, db_path)
-    print(f"Loaded deals from {json_path} into {db_path}")
\ No newline at end of file
+    # Usage: python new_load_data.py deals_data.json ingest.sqlite3 [--force]
+    args = [a for a in sys.argv[1:] if a != "--force"]
+    json_path = args[0] if len(args) > 0 else "deals_data.json"
+    db_path = args[1] if len(args) > 1 else "ingest.sqlite3"
+    if load(json_path, db_path, force="--force" in sys.argv)["status"] == load_manifest.SKIPPED:
+        print(f"Skipped {json_path}: unchanged since last load (use --force to reload)")
+        sys.exit(0)
+    print(f"Loaded deals from {json_path} into {db_path}")
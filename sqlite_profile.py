@@ -0,0 +1,100 @@
+# sqlite_profile.py
+"""
+Named SQLite performance profiles, applied to every connection we open:
+Django's (via wallet.apps), the loaders, wallet.sync, plaid_pull and the raw-SQL views.
+
+    conn = sqlite_profile.connect("db.sqlite3")             # SQLITE_PROFILE or "web"
+    conn = sqlite_profile.connect(db_path, "ingest", isolation_level=None)
+
+Pick the profile per environment with SQLITE_PROFILE (Django, views) and
+SQLITE_INGEST_PROFILE (loaders, sync). "legacy" is SQLite's stock behaviour
+(rollback journal), kept for comparison and for filesystems without WAL support.
+
+The raw Plaid/perks tables live in their own file (INGEST_DB_PATH, default
+ingest.sqlite3) so bulk loads never lock the Django DB; readers that need both
+ATTACH it:
+
+    sqlite_profile.attach(conn, settings.INGEST_DB_PATH, "ingest")
+"""
+import os, sqlite3
+
+# PRAGMA name -> value, applied in this order (journal_mode must come first:
+# it can't change inside a transaction and decides what synchronous means).
+PROFILES = {
+    # Readers never block the writer and vice versa; NORMAL is crash-safe under WAL.
+    "web": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32768,            # KiB when negative: 32 MB page cache
+        "mmap_size": 128 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,            # ms to wait on a lock before "database is locked"
+    },
+    # Bulk loads: bigger cache for index builds, longer wait behind other writers.
+    "ingest": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -131072,           # 128 MB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 60000,
+    },
+    # Every commit fsynced (e.g. prod on network-attached disks).
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -32768,
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+    "legacy": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 0,
+    },
+}
+
+# PRAGMAs that are set per attached database rather than per connection
+_PER_SCHEMA = ("journal_mode", "synchronous", "cache_size", "mmap_size")
+
+DEFAULT_PROFILE = os.getenv("SQLITE_PROFILE", "web")
+INGEST_PROFILE = os.getenv("SQLITE_INGEST_PROFILE", "ingest")
+
+
+def _pragmas(profile):
+    name = profile or DEFAULT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown SQLite profile {name!r} (have: {', '.join(PROFILES)})")
+
+
+def apply(conn: sqlite3.Connection, profile: str = None) -> sqlite3.Connection:
+    """Run the profile's PRAGMAs on an open connection; returns it for chaining."""
+    for pragma, value in _pragmas(profile).items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+def attach(conn: sqlite3.Connection, db_path, alias: str, profile: str = None) -> sqlite3.Connection:
+    """
+    ATTACH db_path AS alias (once per connection) and give it the profile's
+    per-database PRAGMAs. Unqualified table names fall through to attached
+    databases when main doesn't have them, so existing raw SQL keeps working.
+    """
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    if alias not in attached:
+        conn.execute("ATTACH DATABASE ? AS " + alias, (str(db_path),))
+        for pragma, value in _pragmas(profile).items():
+            if pragma in _PER_SCHEMA:
+                conn.execute(f"PRAGMA {alias}.{pragma} = {value}")
+    return conn
+
+
+def connect(db_path, profile: str = None, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect(db_path, **kwargs) with the profile applied."""
+    return apply(sqlite3.connect(str(db_path), **kwargs), profile)
@@ -0,0 +1,118 @@
+"""
+Goal spending alerts (the navbar bell), cached per user.
+
+Alerts depend only on a user's goals and transactions, so they are cached
+under two versions:
+
+  - the generation of the user's data_version.spending_key counter in the
+    ingest DB, which load_bills_to_sqlite bumps whenever it re-aggregates a day
+    holding the user's transactions (wallet.sync does for a full rebuild);
+  - the user's goal version, kept in the Django cache next to the alerts
+    themselves, which goal saves and deletes move through invalidate()
+    (post_save/post_delete in wallet.apps, and the raw SQL in spending_dashboard).
+    A goal save never writes to the ingest DB, which a loader may hold for a while.
+
+A page render then costs one counter lookup and two cache gets.
+"""
+import random
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+
+import data_version
+from .categories import goal_spend_cents
+from .models import Goal
+from .money import to_cents
+
+
+def spending_alerts(user, goals=None) -> dict:
+    """
+    {"spending_alerts", "spending_alert_count", "spending_alert_severity"} for user.
+
+    goals: callable returning user's goals, called only on a cache miss
+    (pass RequestData.goals to share the request's fetch).
+    """
+    instance, version = _version(user.id)
+    key = f"wallet:spending_alerts:{user.id}:{instance}:{version or 0}:{_goal_version(user.id)}"
+    alerts = cache.get(key)
+    if alerts is None:
+        alerts = _compute(user, goals() if goals else Goal.objects.filter(user=user))
+        cache.set(key, alerts)
+    return alerts
+
+
+def invalidate(user_id):
+    """Mark user_id's cached alerts stale (their goals changed)."""
+    key = _goal_version_key(user_id)
+    _start_goal_version(key)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass   # evicted since: the next read starts a fresh version
+
+
+def _goal_version_key(user_id):
+    return f"wallet:goal_version:{user_id}"
+
+
+def _start_goal_version(key):
+    # a random start, so a version that was evicted never comes back to match old alerts
+    cache.add(key, random.getrandbits(48), None)
+
+
+def _goal_version(user_id):
+    key = _goal_version_key(user_id)
+    _start_goal_version(key)
+    return cache.get(key)
+
+
+def _version(user_id):
+    with connection.cursor() as cur:
+        try:
+            return data_version.generation(cur, data_version.spending_key(user_id), "%s")
+        except DatabaseError:
+            return None, 0   # nothing has bumped a counter yet
+
+
+def _compute(user, goals):
+    alerts = []
+
+    for goal in goals:
+        limit_cents = to_cents(goal.limit_amount)
+        if limit_cents <= 0:
+            continue
+        tx_spend = goal_spend_cents(user.id, goal.category, goal.period_start, goal.period_end)
+        effective_spend = max(to_cents(goal.current_spend), tx_spend)
+        percent = (effective_spend / limit_cents) * 100
+
+        if percent >= 100:
+            level = "danger"
+            threshold = "100%"
+        elif percent >= 90:
+            level = "warning"
+            threshold = "90%"
+        elif percent >= 75:
+            level = "warning"
+            threshold = "75%"
+        else:
+            continue
+
+        alerts.append(
+            {
+                "goal_id": goal.id,
+                "category": goal.category,
+                "percent": round(percent),
+                "threshold": threshold,
+                "level": level,
+            }
+        )
+
+    alerts.sort(key=lambda a: a["percent"], reverse=True)
+    severity = None
+    if alerts:
+        severity = "danger" if any(a["percent"] >= 100 for a in alerts) else "warning"
+    return {
+        "spending_alerts": alerts,
+        "spending_alert_count": len(alerts),
+        "spending_alert_severity": severity,
+    }
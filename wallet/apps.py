@@ -1,6 +1,54 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+
+
+def _configure_sqlite(sender, connection, **kwargs):
+    """
+    Give Django's own SQLite connections the same PRAGMAs as our raw ones and
+    attach the ingest DB, so raw SQL over `transactions`, `cards`, ... resolves there.
+    Refuses a main DB that still holds those tables: unqualified names would
+    resolve to the stale copies in main instead of the attached ones.
+    """
+    if connection.vendor == "sqlite":
+        from django.conf import settings
+        from django.core.exceptions import ImproperlyConfigured
+        import sqlite_profile
+        from .management.commands.split_ingest_db import INGEST_TABLES
+
+        conn = connection.connection
+        sqlite_profile.apply(conn, settings.SQLITE_PROFILE)
+        stale = [row[0] for row in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type = 'table' AND name IN (%s) ORDER BY name"
+            % ", ".join("?" * len(INGEST_TABLES)), INGEST_TABLES)]
+        if stale:
+            raise ImproperlyConfigured(
+                f"{', '.join(stale)} still in the Django DB; run `python manage.py split_ingest_db` "
+                f"to move them to {settings.INGEST_DB_PATH}")
+        sqlite_profile.attach(conn, settings.INGEST_DB_PATH,
+                              settings.INGEST_DB_ALIAS, settings.SQLITE_PROFILE)
+
+
+def _goal_saved(sender, instance, **kwargs):
+    """Match a goal's category text against the category dictionary up front."""
+    from .categories import resolve_patterns
+    resolve_patterns([instance.category])
+
+
+def _goal_changed(sender, instance, **kwargs):
+    """A goal was saved or deleted: its owner's cached spending alerts are stale."""
+    from .alerts import invalidate
+    invalidate(instance.user_id)
 
 
 class WalletConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "wallet"
+
+    def ready(self):
+        connection_created.connect(_configure_sqlite, dispatch_uid="wallet.sqlite_profile")
+
+        from .models import Goal
+        post_save.connect(_goal_saved, sender=Goal, dispatch_uid="wallet.categories.goal_saved")
+        post_save.connect(_goal_changed, sender=Goal, dispatch_uid="wallet.alerts.goal_saved")
+        post_delete.connect(_goal_changed, sender=Goal, dispatch_uid="wallet.alerts.goal_deleted")
@@ -0,0 +1,173 @@
+"""
+Card catalog: the raw `cards` rows with their bonus categories, perks, welcome
+bonus and current period, plus the `deals` table, hydrated once and shared
+read-only by every request in the process.
+
+The loaders bump data_version.CARD_CATALOG in the same transaction as their
+writes (load_perks_to_sqlite, load_deals_to_sqlite, and load_bills_to_sqlite
+when it mirrors a credit account into cards). get_catalog() costs one
+primary-key lookup of that counter's generation (data_version.generation); the
+hydration queries only run again once it has moved.
+
+    catalog = get_catalog()
+    cards = catalog.cards_for(request.user.id)            # raw cards, hydrated
+    card = catalog.card(c.id, id=c.id, card_name=c.name)  # any other card row
+"""
+import threading
+from types import MappingProxyType
+
+from django.db import DatabaseError, connection, transaction
+
+import data_version
+
+
+class CardCatalog:
+    """Immutable snapshot of the catalog as of `version` (a data_version generation)."""
+
+    def __init__(self, version, cards, extras, deals):
+        self.version = version
+        self._cards = cards      # ((user_id, base fields), ...) in issuer, card_name order
+        self._extras = extras    # card_id -> {"bonus_categories", "perks", "welcome_bonus", "current_period"}
+        self.deals = deals
+
+    def card(self, card_id, **fields) -> dict:
+        """A new card dict: `fields` plus the catalog's extras for card_id (shared, read-only)."""
+        card = dict(fields)
+        card.update(self._extras.get(card_id) or _NO_EXTRAS)
+        return card
+
+    def cards_for(self, user_id) -> list:
+        """Catalog cards (no owner) and user_id's mirrored cards, hydrated."""
+        return [self.card(base["id"], **base)
+                for owner, base in self._cards if owner is None or owner == user_id]
+
+
+_NO_EXTRAS = MappingProxyType({
+    "bonus_categories": (),
+    "perks": (),
+    "welcome_bonus": None,
+    "current_period": None,
+})
+
+_lock = threading.Lock()
+_catalog = None
+
+
+def get_catalog() -> CardCatalog:
+    """The cached catalog, rebuilt first if a loader has bumped its version since."""
+    global _catalog
+    catalog = _catalog
+    if catalog is None or catalog.version != _current_version():
+        with _lock:
+            if _catalog is None or _catalog.version != _current_version():
+                _catalog = _build()
+            catalog = _catalog
+    return catalog
+
+
+def _current_version():
+    with connection.cursor() as cur:
+        try:
+            return data_version.generation(cur, data_version.CARD_CATALOG, "%s")
+        except DatabaseError:
+            return None   # no loader has run yet
+
+
+def _build() -> CardCatalog:
+    # one read transaction: the version and the rows it describes come from the same snapshot
+    with transaction.atomic(), connection.cursor() as cur:
+        try:
+            with transaction.atomic():
+                version = data_version.generation(cur, data_version.CARD_CATALOG, "%s")
+        except DatabaseError:
+            version = None
+
+        cur.execute("""
+            SELECT id, card_name, issuer, COALESCE(annual_fee, 0), type, COALESCE(base_reward_rate, 0), user_id
+            FROM cards
+            ORDER BY issuer, card_name
+        """)
+        cards = tuple(
+            (owner, MappingProxyType({
+                "id": cid,
+                "card_name": name or "",
+                "issuer": issuer or "",
+                "annual_fee": float(fee or 0),
+                "type": ctype or "",
+                "base_reward_rate": float(base_rate or 0),
+            }))
+            for cid, name, issuer, fee, ctype, base_rate, owner in cur.fetchall()
+        )
+
+        bonus_categories, perks, welcome_bonus, current_period = {}, {}, {}, {}
+        cur.execute("""
+            SELECT card_id, idx, category_name, reward_rate, cap, note
+            FROM bonus_categories
+            ORDER BY card_id, idx
+        """)
+        for card_id, idx, cat_name, rate, cap, note in cur.fetchall():
+            bonus_categories.setdefault(card_id, []).append(MappingProxyType({
+                "category_name": cat_name or "",
+                "reward_rate": float(rate or 0),
+                "cap": None if cap is None else float(cap),
+                "note": note or "",
+            }))
+
+        cur.execute("""
+            SELECT card_id, idx, perk_name, description, frequency
+            FROM perks
+            ORDER BY card_id, idx
+        """)
+        for card_id, idx, perk_name, desc, freq in cur.fetchall():
+            perks.setdefault(card_id, []).append(MappingProxyType({
+                "perk_name": perk_name or "",
+                "description": desc or "",
+                "frequency": freq or "",
+            }))
+
+        cur.execute("""
+            SELECT card_id, points, cash_back, points_or_cash, spend_requirement, time_frame_months
+            FROM welcome_bonuses
+        """)
+        for card_id, points, cash_back, poc, spend_req, tf_months in cur.fetchall():
+            welcome_bonus[card_id] = MappingProxyType({
+                "points": None if points is None else int(points),
+                "cash_back": None if cash_back is None else float(cash_back),
+                "points_or_cash": None if poc is None else float(poc),
+                "spend_requirement": None if spend_req is None else float(spend_req),
+                "time_frame_months": None if tf_months is None else int(tf_months),
+            })
+
+        cur.execute("""
+            SELECT card_id, start_date, end_date
+            FROM card_current_period
+        """)
+        for card_id, start_date, end_date in cur.fetchall():
+            current_period[card_id] = MappingProxyType({
+                "start_date": start_date,
+                "end_date": end_date,
+            })
+
+        try:
+            with transaction.atomic():
+                cur.execute("""
+                    SELECT id, card_id, deal_type, title, subtitle, benefit, expiry_date, finer_details,
+                           issuer, card_name
+                    FROM deals
+                    ORDER BY expiry_date ASC, card_name ASC
+                """)
+                cols = [c[0] for c in cur.description]
+                deals = tuple(MappingProxyType(dict(zip(cols, row))) for row in cur.fetchall())
+        except DatabaseError:
+            deals = ()   # deals loader hasn't run yet
+
+    extras = {
+        card_id: MappingProxyType({
+            "bonus_categories": tuple(bonus_categories.get(card_id, ())),
+            "perks": tuple(perks.get(card_id, ())),
+            "welcome_bonus": welcome_bonus.get(card_id),
+            "current_period": current_period.get(card_id),
+        })
+        for card_id in bonus_categories.keys() | perks.keys() | welcome_bonus.keys() | current_period.keys()
+    }
+    return CardCatalog(version, cards, extras, deals)
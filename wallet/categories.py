@@ -0,0 +1,87 @@
+"""
+Goal -> category matching over the ingest `categories` dictionary.
+
+A goal's free-text category ("Food") is matched against category names when
+the goal is saved (and again after every sync, for any save that couldn't
+write), and the matching ids are kept in category_pattern_matches. A trigger
+maps categories that show up later (see load_bills_to_sqlite.ensure_schema).
+Goal spend is then an equi-join on the indexed transaction_categories.category_id
+instead of `LIKE '%Food%'` over every category row. Reads never write: a
+pattern that isn't resolved yet is matched with LIKE on the spot.
+"""
+from django.db import DatabaseError, connection, transaction
+
+from .days import day_number
+
+# Spend for one goal: the pattern's category ids -> their transactions in the
+# period. IN, not a join: a transaction with several matching categories counts once
+GOAL_SPEND_SQL = """
+    SELECT COALESCE(SUM(t.amount_cents), 0)
+    FROM transactions t
+    WHERE t.user_id = %s
+      AND t.day_num BETWEEN %s AND %s
+      AND t.transaction_id IN (
+          SELECT c.transaction_id
+          FROM transaction_categories c
+          JOIN category_pattern_matches m ON m.category_id = c.category_id
+          WHERE m.pattern = %s
+      )
+"""
+
+# The same for a pattern not resolved yet, matching category names directly
+UNRESOLVED_GOAL_SPEND_SQL = """
+    SELECT COALESCE(SUM(t.amount_cents), 0)
+    FROM transactions t
+    WHERE t.user_id = %s
+      AND t.day_num BETWEEN %s AND %s
+      AND t.transaction_id IN (
+          SELECT c.transaction_id
+          FROM transaction_categories c
+          JOIN categories k ON k.id = c.category_id
+          WHERE k.name LIKE %s
+      )
+"""
+
+
+def match_patterns(cur, patterns, placeholder="%s"):
+    """
+    Match any goal category texts not seen before against the dictionary, on
+    an open cursor (placeholder "?" for a raw sqlite3 one). The caller commits.
+    """
+    patterns = {p for p in patterns if p}
+    if not patterns:
+        return
+    marks = ",".join([placeholder] * len(patterns))
+    cur.execute(f"SELECT pattern FROM category_patterns WHERE pattern IN ({marks})", list(patterns))
+    for pattern in patterns - {row[0] for row in cur.fetchall()}:
+        # pattern first, so a category inserted concurrently is caught by the trigger
+        cur.execute(f"INSERT OR IGNORE INTO category_patterns (pattern) VALUES ({placeholder})", [pattern])
+        cur.execute(f"""
+            INSERT OR IGNORE INTO category_pattern_matches (pattern, category_id)
+            SELECT {placeholder}, id FROM categories WHERE name LIKE {placeholder}
+        """, [pattern, f"%{pattern}%"])
+
+
+def resolve_patterns(patterns):
+    """
+    match_patterns on Django's connection, for a goal that was just saved.
+    Best effort: if a loader holds the ingest DB the goal still reads correctly
+    (see goal_spend_cents) and the next sync resolves it.
+    """
+    try:
+        with transaction.atomic(), connection.cursor() as cur:
+            match_patterns(cur, patterns)
+    except DatabaseError:
+        pass
+
+
+def goal_spend_cents(user_id, category, period_start, period_end) -> int:
+    """Cents user_id spent in [period_start, period_end] on categories matching the goal's text."""
+    with connection.cursor() as cur:
+        cur.execute("SELECT 1 FROM category_patterns WHERE pattern = %s", [category])
+        if cur.fetchone():
+            sql, match = GOAL_SPEND_SQL, category
+        else:
+            sql, match = UNRESOLVED_GOAL_SPEND_SQL, f"%{category}%"
+        cur.execute(sql, [user_id, day_number(period_start), day_number(period_end), match])
+        return cur.fetchone()[0] or 0
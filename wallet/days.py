@@ -0,0 +1,22 @@
+"""
+Day numbers at the edges.
+
+The ingest tables carry each date as an integer day_num (date.toordinal()),
+plus week ((day_num - 1) // 7, Monday-based) and month (YYYYMM) buckets, all
+written by the loader. Date windows are then integer range scans on an index
+instead of SQLite date functions evaluated per row: turn the window's bounds
+into day numbers here and compare against day_num.
+"""
+from datetime import date
+
+
+def day_number(value) -> int:
+    """date/datetime or ISO string -> day_num (date.toordinal())."""
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def week_label(day) -> str:
+    """ISO day -> "YYYY-Www" (Monday-based, like strftime('%Y-W%W'))."""
+    return date.fromisoformat(str(day)[:10]).strftime("%Y-W%W")
@@ -0,0 +1,103 @@
+import os, sqlite3, statistics, tempfile, threading, time
+
+from django.core.management.base import BaseCommand
+
+import sqlite_profile
+
+
+def _setup(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE transactions (
+          transaction_id TEXT PRIMARY KEY,
+          account_id     TEXT NOT NULL,
+          amount         REAL NOT NULL,
+          date           TEXT NOT NULL
+        );
+        CREATE INDEX idx_transactions_date ON transactions(date);
+    """)
+    conn.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?)",
+                     [(f"t{i}", f"acc{i % 7}", i % 250 + 0.99, f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}")
+                      for i in range(rows)])
+    conn.commit()
+    conn.close()
+
+
+def _run(db_path, profile, readers, seconds, batch):
+    """One ingest-style writer + `readers` dashboard-style readers for `seconds`."""
+    stop = threading.Event()
+    lat, errors, written = [], [0], [0]
+    lock = threading.Lock()
+
+    def writer():
+        conn = sqlite_profile.connect(db_path, profile, isolation_level=None)
+        n = 0
+        while not stop.is_set():
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?)",
+                                 [(f"w{n + i}", "acc1", 9.99, "2025-06-15") for i in range(batch)])
+                conn.execute("COMMIT")
+                n += batch
+            except sqlite3.OperationalError:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                with lock:
+                    errors[0] += 1
+        written[0] = n
+        conn.close()
+
+    def reader():
+        conn = sqlite_profile.connect(db_path, profile)
+        mine = []
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                conn.execute("""
+                    SELECT date, SUM(amount) FROM transactions
+                     WHERE date >= '2025-06-01' GROUP BY date
+                """).fetchall()
+                mine.append(time.perf_counter() - t0)
+            except sqlite3.OperationalError:
+                with lock:
+                    errors[0] += 1
+        conn.close()
+        with lock:
+            lat.extend(mine)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    lat.sort()
+    return {
+        "reads_per_sec": round(len(lat) / seconds),
+        "read_p95_ms": round(lat[int(len(lat) * 0.95) - 1] * 1000, 2) if lat else None,
+        "read_median_ms": round(statistics.median(lat) * 1000, 2) if lat else None,
+        "rows_written_per_sec": round(written[0] / seconds),
+        "lock_errors": errors[0],
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent reads + an ingest writer under each SQLite profile (sqlite_profile.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("profiles", nargs="*", default=["legacy", "web"],
+                            help=f"Profiles to compare (have: {', '.join(sqlite_profile.PROFILES)}).")
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--rows", type=int, default=50000, help="Rows seeded before the run.")
+        parser.add_argument("--batch", type=int, default=500, help="Rows per writer transaction.")
+
+    def handle(self, *args, **options):
+        for profile in options["profiles"]:
+            with tempfile.TemporaryDirectory() as tmp:
+                db_path = os.path.join(tmp, "bench.sqlite3")
+                _setup(db_path, options["rows"])
+                result = _run(db_path, profile, options["readers"], options["seconds"], options["batch"])
+            self.stdout.write(f"{profile:>8}: " + ", ".join(f"{k}={v}" for k, v in result.items()))
@@ -0,0 +1,61 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+import sqlite_profile
+
+# Tables written by the loaders / sync rather than by Django migrations
+INGEST_TABLES = (
+    "accounts", "transactions", "transaction_categories", "items", "meta",
+    "cards", "perks", "bonus_categories", "welcome_bonuses", "card_current_period",
+    "deals", "load_manifest", "sync_state",
+)
+
+
+class Command(BaseCommand):
+    help = "Move the raw ingest tables out of the Django DB into INGEST_DB_PATH (one-off, idempotent)."
+
+    def handle(self, *args, **options):
+        alias = settings.INGEST_DB_ALIAS
+        conn = sqlite_profile.connect(settings.DATABASES["default"]["NAME"], isolation_level=None)
+        sqlite_profile.attach(conn, settings.INGEST_DB_PATH, alias)
+        cur = conn.cursor()
+        cur.execute("PRAGMA foreign_keys = OFF")
+
+        def tables(schema):
+            cur.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type='table'")
+            return {r[0] for r in cur.fetchall()}
+
+        in_main, in_ingest = tables("main"), tables(alias)
+        moved = []
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            for table in INGEST_TABLES:
+                if table not in in_main:
+                    continue
+                if table in in_ingest:
+                    self.stdout.write(self.style.WARNING(
+                        f"{table}: exists in both databases, left alone (drop one copy by hand)"))
+                    continue
+                cur.execute("SELECT type, sql FROM main.sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL "
+                            "ORDER BY type = 'table' DESC", (table,))
+                for kind, sql in cur.fetchall():
+                    # qualify the new object's name: CREATE TABLE x / CREATE INDEX i / CREATE TRIGGER t
+                    cur.execute(re.sub(r"^(CREATE\s+(?:UNIQUE\s+)?(?:TABLE|INDEX|TRIGGER)\s+)",
+                                       rf"\1{alias}.", sql, count=1, flags=re.I))
+                    if kind == "table":
+                        cur.execute(f"INSERT INTO {alias}.{table} SELECT * FROM main.{table}")
+                cur.execute(f"DROP TABLE main.{table}")
+                moved.append(table)
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        if moved:
+            self.stdout.write(self.style.SUCCESS(f"Moved to {settings.INGEST_DB_PATH}: {', '.join(moved)}"))
+        else:
+            self.stdout.write("Nothing to move.")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from wallet.sync import is_stale, run_sync
+
+
+class Command(BaseCommand):
+    help = "Reload bills.json and pull Plaid transaction deltas into the raw transaction tables (for cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--if-stale", action="store_true",
+                            help="Only sync when the last sync is older than PLAID_SYNC_TTL.")
+        parser.add_argument("--full", action="store_true",
+                            help="Rebuild transactions + transaction_categories from scratch (shadow load, then atomic swap).")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Plaid items synced in parallel (default: PLAID_SYNC_WORKERS).")
+
+    def handle(self, *args, **options):
+        if options["if_stale"] and not is_stale():
+            self.stdout.write("Data is fresh, nothing to do.")
+            return
+        counts = run_sync(wipe_transactions=options["full"], on_progress=self.progress,
+                          max_workers=options["workers"])
+        self.stdout.write(self.style.SUCCESS(f"Synced: {counts}"))
+
+    def progress(self, item_id, progress):
+        """Called from the sync worker threads after every page of an item."""
+        state = "done" if progress["done"] else f"page {progress['pages']}"
+        self.stdout.write(f"{item_id}: {state} "
+                          f"(+{progress['added']} ~{progress['modified']} -{progress['removed']})")
@@ -0,0 +1,21 @@
+"""
+Money at the edges.
+
+The ingest tables keep amounts as integer cents (transactions.amount_cents,
+daily_spend.total_cents) so SQLite sums them exactly and fast. Convert to
+dollars only when a value leaves for a template, JSON or a prompt, and bring
+DecimalField amounts (goal limits, subscriptions) to cents before comparing.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def to_cents(value) -> int:
+    """Dollars (Decimal/float/str/None) -> integer cents, rounding half up."""
+    if value is None or value == "":
+        return 0
+    return int((Decimal(str(value)) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def from_cents(cents) -> float:
+    """Integer cents (or a cents average) -> dollars for display."""
+    return round((cents or 0) / 100, 2)
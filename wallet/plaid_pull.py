@@ -10,6 +10,7 @@ except ImportError:
     from plaid.configuration import Configuration
     from plaid.api_client import ApiClient
 
+import plaid
 from plaid.api import plaid_api
 from plaid.model.products import Products
 from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
@@ -18,7 +19,14 @@ from plaid.model.transactions_sync_request import TransactionsSyncRequest
 from plaid.model.sandbox_public_token_create_request import SandboxPublicTokenCreateRequest
 
 # --- add near the top of plaid_pull.py, below imports ---
-import sqlite3
+import sqlite3, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+
+import data_version, sqlite_profile
+from .sync import sync_lock
 
 def _s(v):
     """Make Plaid enums/objects JSON-serializable (unwrap to str)."""
@@ -29,7 +37,7 @@ def _s(v):
 def _db_counts(db_path: Path):
     """Quick debug counts to confirm we wrote to the DB we think we did."""
     try:
-        conn = sqlite3.connect(str(db_path))
+        conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE)
         cur = conn.cursor()
         counts = {}
         for table in ("accounts", "transactions", "transaction_categories", "items", "meta"):
@@ -54,41 +62,170 @@ def _plaid_host() -> str:
     }.get(env, "https://sandbox.plaid.com")
 
 
-def _plaid_client() -> plaid_api.PlaidApi:
-    cfg = Configuration(
-        host=_plaid_host(),  # <- use URL string, not Environment enum
-        api_key={
-            "clientId": os.getenv("PLAID_CLIENT_ID", ""),
-            "secret":   os.getenv("PLAID_SECRET", ""),
-        },
-    )
-    return plaid_api.PlaidApi(ApiClient(cfg))
+# HTTP tuning for the shared client (env overridable)
+PLAID_POOL_SIZE       = int(os.getenv("PLAID_POOL_SIZE", "8"))          # keep-alive connections
+PLAID_CONNECT_TIMEOUT = float(os.getenv("PLAID_CONNECT_TIMEOUT", "5"))  # seconds
+PLAID_READ_TIMEOUT    = float(os.getenv("PLAID_READ_TIMEOUT", "30"))    # seconds
+PLAID_MAX_RETRIES     = int(os.getenv("PLAID_MAX_RETRIES", "4"))
+PLAID_RETRY_BACKOFF   = float(os.getenv("PLAID_RETRY_BACKOFF", "0.5"))  # 0.5s, 1s, 2s, ...
+
+# (connect, read) seconds, passed by _call() on every API call
+_TIMEOUT = (PLAID_CONNECT_TIMEOUT, PLAID_READ_TIMEOUT)
+
+# Multi-item sync: worker threads, and the request rate shared by ALL of them
+PLAID_SYNC_WORKERS = int(os.getenv("PLAID_SYNC_WORKERS", "4"))
+PLAID_RATE_PER_SEC = float(os.getenv("PLAID_RATE_PER_SEC", "10"))
+PLAID_RATE_BURST   = int(os.getenv("PLAID_RATE_BURST", "20"))
+
+
+class _TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 
+_limiter = _TokenBucket(PLAID_RATE_PER_SEC, PLAID_RATE_BURST)
 
-def _sandbox_access_token() -> str:
+
+def _call(api_method, request):
+    """Every Plaid API call goes through here: global rate limit + timeouts."""
+    _limiter.acquire()
+    return api_method(request, _request_timeout=_TIMEOUT)
+
+
+# Endpoints that are safe to send twice. Anything else (/item/public_token/exchange:
+# the public_token is single-use) is retried only when the request never went out.
+_IDEMPOTENT_PATHS = frozenset({"/transactions/sync", "/accounts/get", "/sandbox/public_token/create"})
+
+
+class _IdempotentRetry(Retry):
+    """
+    Retry: read errors and 429/5xx are retried only for _IDEMPOTENT_PATHS, and
+    every resend takes a _limiter token like any other request.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if urlsplit(url or "").path not in _IDEMPOTENT_PATHS and not (error and self._is_connection_error(error)):
+            # out of retries: urllib3 raises, or hands the 429/5xx back (raise_on_status=False)
+            return Retry.increment(self.new(total=0), method, url, response, error, _pool, _stacktrace)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+    def sleep(self, response=None):
+        # urllib3 calls this right before each resend: back off, then wait our turn
+        super().sleep(response)
+        _limiter.acquire()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _plaid_client() -> plaid_api.PlaidApi:
+    """
+    The process-wide Plaid client. Built once; its urllib3 pool keeps TLS
+    connections alive across calls and syncs, and retries 429/5xx with
+    exponential backoff (honouring Retry-After) on idempotent endpoints,
+    within the shared rate limit.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                cfg = Configuration(
+                    host=_plaid_host(),  # <- use URL string, not Environment enum
+                    api_key={
+                        "clientId": os.getenv("PLAID_CLIENT_ID", ""),
+                        "secret":   os.getenv("PLAID_SECRET", ""),
+                    },
+                )
+                cfg.connection_pool_maxsize = PLAID_POOL_SIZE
+                cfg.retries = _IdempotentRetry(
+                    total=PLAID_MAX_RETRIES,
+                    backoff_factor=PLAID_RETRY_BACKOFF,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=None,          # Plaid is all POST; _IDEMPOTENT_PATHS decides
+                    respect_retry_after_header=True,
+                    raise_on_status=False,         # hand the final error to the SDK
+                )
+                _client = plaid_api.PlaidApi(ApiClient(cfg))
+    return _client
+
+
+def _sandbox_item() -> tuple[str, str]:
     """
     Create a Sandbox public_token (no UI) and exchange it.
     Institution: First Platypus Bank (ins_109508).
+    Returns (access_token, item_id).
     """
     client = _plaid_client()
-    pub = client.sandbox_public_token_create(
+    pub = _call(
+        client.sandbox_public_token_create,
         SandboxPublicTokenCreateRequest(
             institution_id="ins_109508",
             initial_products=[Products("transactions")],
-        )
+        ),
     )
-    exch = client.item_public_token_exchange(
-        ItemPublicTokenExchangeRequest(public_token=pub.public_token)
+    exch = _call(
+        client.item_public_token_exchange,
+        ItemPublicTokenExchangeRequest(public_token=pub.public_token),
     )
-    return exch.access_token
+    return exch.access_token, exch.item_id
 
 
-def _transactions_sync(access_token: str):
-    """Fetch ALL transactions using /transactions/sync without passing cursor=None."""
-    client = _plaid_client()
-    added, modified, removed, req_id = [], [], [], None
-    cursor, has_more = None, True
+def _stored_item(db_path: Path):
+    """
+    The most recently linked item we hold an access_token for, as
+    (item_id, access_token, cursor, user_id) -- or None if nothing is linked yet.
+    """
+    try:
+        conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE)
+        try:
+            row = conn.execute("""
+                SELECT item_id, access_token, cursor, user_id
+                FROM items
+                WHERE access_token IS NOT NULL AND access_token != ''
+                ORDER BY rowid DESC
+                LIMIT 1
+            """).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.OperationalError:
+        # no items table yet (fresh DB) or an old one without access_token
+        return None
+    return row
+
+
+def _error_code(exc: plaid.ApiException) -> str:
+    try:
+        return json.loads(exc.body or "{}").get("error_code", "")
+    except ValueError:
+        return ""
 
+
+def _transactions_sync_pages(client: plaid_api.PlaidApi, access_token: str, cursor: str | None = None):
+    """
+    Yield /transactions/sync responses one page at a time, starting at `cursor`
+    (None = full history) until has_more is False. The last page's next_cursor
+    is what to persist for the next delta sync.
+    """
+    has_more = True
     while has_more:
         # IMPORTANT: omit cursor on the very first request
         if cursor:
@@ -96,56 +233,40 @@ def _transactions_sync(access_token: str):
         else:
             req = TransactionsSyncRequest(access_token=access_token)
 
-        resp = client.transactions_sync(req)
-
-        added.extend(resp.added)
-        modified.extend(resp.modified)
-        removed.extend(resp.removed)
+        resp = _call(client.transactions_sync, req)
+        yield resp
 
         cursor = resp.next_cursor
         has_more = resp.has_more
-        req_id = getattr(resp, "request_id", None)
-
-    return added, modified, removed, req_id
 
 
 def _accounts(access_token: str):
     client = _plaid_client()
-    return client.accounts_get(AccountsGetRequest(access_token=access_token)).accounts
-
+    return _call(client.accounts_get, AccountsGetRequest(access_token=access_token)).accounts
 
-def _make_loader_dict(access_token: str) -> dict:
-    added, modified, removed, req_id = _transactions_sync(access_token)
-    accts = _accounts(access_token)
 
-    accounts_json = [{
+def _account_dict(a) -> dict:
+    return {
         "account_id": a.account_id,
         "mask": _s(getattr(a, "mask", None)),
         "name": _s(getattr(a, "name", None)),
         "official_name": _s(getattr(a, "official_name", None)),
         "subtype": _s(getattr(a, "subtype", None)),
         "type": _s(getattr(a, "type", None)),
-    } for a in accts]
-
-    tx_json = []
-    for t in (added + modified):
-        tx_json.append({
-            "transaction_id": t.transaction_id,
-            "account_id": t.account_id,
-            "amount": float(Decimal(str(t.amount))),
-            "date": str(t.date),
-            "name": _s(getattr(t, "name", "")),
-            "merchant_name": _s(getattr(t, "merchant_name", "")),
-            "payment_channel": _s(getattr(t, "payment_channel", "")),
-            "category": [_s(c) for c in (getattr(t, "category", []) or [])],
-        })
+    }
+
 
+def _transaction_dict(t) -> dict:
+    """A Plaid Transaction in the loader's JSON shape."""
     return {
-        "accounts": accounts_json,
-        "transactions": tx_json,
-        "item": {"item_id": "", "institution_id": "", "webhook": ""},
-        "request_id": req_id or "",
-        "total_transactions": len(tx_json),
+        "transaction_id": t.transaction_id,
+        "account_id": t.account_id,
+        "amount": float(Decimal(str(t.amount))),
+        "date": str(t.date),
+        "name": _s(getattr(t, "name", "")),
+        "merchant_name": _s(getattr(t, "merchant_name", "")),
+        "payment_channel": _s(getattr(t, "payment_channel", "")),
+        "category": [_s(c) for c in (getattr(t, "category", []) or [])],
     }
 
 def _import_loader(loader_path: Path):
@@ -155,30 +276,181 @@ def _import_loader(loader_path: Path):
     return mod
 
 
-def sync_plaid_to_sqlite(json_path: Path, db_path: Path, loader_path: Path):
+def _migrate(db_path: Path, loader):
+    """Bring the ingest schema up to date before reading items (e.g. items.user_id)."""
+    conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE, isolation_level=None)
+    try:
+        loader.ensure_schema(conn.cursor())
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _write_txn(cur):
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on an isolation_level=None connection."""
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+        data_version.bump(cur, data_version.INGEST)
+    except BaseException:
+        cur.execute("ROLLBACK")
+        raise
+    cur.execute("COMMIT")
+
+
+def _sync_item(db_path: Path, loader, item_id: str, access_token: str, cursor: str | None,
+               user_id: int | None = None, on_progress=None) -> dict:
     """
-    1) Pull Sandbox data
-    2) Write JSON in your loader's shape
-    3) Call your loader (load(json_path, db_path))
-    4) Return counts for quick verification
+    Sync one item from `cursor`: each /transactions/sync page is applied in its own
+    short write transaction, so parallel workers only hold the SQLite write lock
+    for milliseconds. The item's next_cursor is saved only after the last page;
+    an interrupted sync replays from the old cursor, which is safe because
+    deltas are keyed by transaction_id. Accounts (and so their transactions) are
+    owned by user_id, the loader's default user when None.
+    Returns the added/modified/removed totals.
     """
-    access_token = _sandbox_access_token()
-    data = _make_loader_dict(access_token)
+    user_id = user_id or loader.DEFAULT_USER_ID
+    client = _plaid_client()
+    accounts = [_account_dict(a) for a in _accounts(access_token)]
+
+    # isolation_level=None: we open/commit the transactions ourselves
+    conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE, isolation_level=None)
+    cur = conn.cursor()
+
+    try:
+        loader.ensure_schema(cur)
+        with _write_txn(cur):
+            loader.upsert_accounts(cur, accounts, user_id)
+            loader.seed_transactions_from_accounts(cur, accounts)
+        while True:
+            progress = {"pages": 0, "added": 0, "modified": 0, "removed": 0, "done": False}
+            req_id, next_cursor = None, cursor
+            try:
+                for page in _transactions_sync_pages(client, access_token, cursor):
+                    with _write_txn(cur):
+                        applied = loader.apply_transaction_deltas(
+                            cur,
+                            added=[_transaction_dict(t) for t in page.added],
+                            modified=[_transaction_dict(t) for t in page.modified],
+                            removed_ids=[r.transaction_id for r in page.removed],
+                        )
+                    for k, n in applied.items():
+                        progress[k] += n
+                    progress["pages"] += 1
+                    next_cursor = page.next_cursor
+                    req_id = getattr(page, "request_id", None)
+                    if on_progress:
+                        on_progress(item_id, dict(progress))
+                break
+            except plaid.ApiException as e:
+                # Plaid asks us to restart the whole pagination from the original cursor
+                if _error_code(e) == "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION":
+                    continue
+                raise
+
+        item = {"item_id": item_id, "institution_id": "", "webhook": "",
+                "access_token": access_token, "cursor": next_cursor, "user_id": user_id}
+        with _write_txn(cur):
+            loader.save_item_meta(cur, item, req_id or "", progress["added"] + progress["modified"])
+    finally:
+        conn.close()
+
+    progress["done"] = True
+    if on_progress:
+        on_progress(item_id, dict(progress))
+    return progress
+
 
-    json_path = json_path.resolve()
+def sync_plaid_to_sqlite(db_path: Path, loader_path: Path):
+    """
+    1) Pull Sandbox accounts + /transactions/sync pages (only the delta since the
+       item's stored cursor)
+    2) Apply each page's added / modified / removed straight into SQLite with
+       your loader's apply_transaction_deltas -- no intermediate JSON file,
+       nothing accumulated in memory
+    3) Save the item's next_cursor once every page is in
+    4) Return counts for quick verification
+    """
     db_path = db_path.resolve()
     loader_path = loader_path.resolve()
 
-    json_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False)
+    with sync_lock(db_path):   # the lock wallet.sync.run_sync takes
+        loader = _import_loader(loader_path)
+        _migrate(db_path, loader)
+
+        stored = _stored_item(db_path)
+        if stored:
+            item_id, access_token, cursor, user_id = stored
+        else:
+            access_token, item_id = _sandbox_item()
+            cursor = user_id = None
 
-    loader = _import_loader(loader_path)
-    # Your loader reads the JSON file and writes to SQLite
-    loader.load(str(json_path), str(db_path))
+        deltas = _sync_item(db_path, loader, item_id, access_token, cursor, user_id)
 
     counts = _db_counts(db_path)
-    print(f"[Plaid→Loader] JSON: {json_path}")
     print(f"[Plaid→Loader] DB:   {db_path}")
+    print(f"[Plaid→Loader] Deltas applied: {deltas}")
     print(f"[Plaid→Loader] Counts after load: {counts}")
+    counts["deltas"] = deltas
     return counts
+
+
+def _linked_items(db_path: Path):
+    """Every (item_id, access_token, cursor, user_id) we can sync."""
+    conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE)
+    try:
+        return conn.execute("""
+            SELECT item_id, access_token, cursor, user_id
+            FROM items
+            WHERE access_token IS NOT NULL AND access_token != ''
+            ORDER BY item_id
+        """).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+
+
+def _print_progress(item_id, progress):
+    state = "done" if progress["done"] else f"page {progress['pages']}"
+    print(f"[Plaid→Loader] {item_id}: {state} "
+          f"(+{progress['added']} ~{progress['modified']} -{progress['removed']})")
+
+
+def sync_all_items(db_path: Path, loader_path: Path, max_workers: int = PLAID_SYNC_WORKERS,
+                   on_progress=_print_progress):
+    """
+    Sync every linked item in parallel on a bounded worker pool. All workers share
+    the process-wide client and its rate limiter, so the fan-out stays under
+    Plaid's per-client limits. on_progress(item_id, progress) is called after each
+    page and once more with progress["done"] = True. With nothing linked yet a
+    Sandbox item is created, as sync_plaid_to_sqlite does.
+    Returns {"items": {item_id: progress | {"error": ...}}, "counts": table counts}.
+    """
+    db_path = db_path.resolve()
+    with sync_lock(db_path):   # the lock wallet.sync.run_sync takes
+        loader = _import_loader(loader_path.resolve())
+        _migrate(db_path, loader)
+        items = _linked_items(db_path)
+        if not items:
+            access_token, item_id = _sandbox_item()
+            items = [(item_id, access_token, None, None)]
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="plaid-sync") as pool:
+            futures = {
+                pool.submit(_sync_item, db_path, loader, item_id, access_token, cursor, user_id, on_progress): item_id
+                for item_id, access_token, cursor, user_id in items
+            }
+            for fut in as_completed(futures):
+                item_id = futures[fut]
+                try:
+                    results[item_id] = fut.result()
+                except Exception as e:
+                    results[item_id] = {"error": str(e)}
+                    print(f"[Plaid→Loader] {item_id}: failed: {e}")
+
+    counts = _db_counts(db_path)
+    failed = sum(1 for r in results.values() if "error" in r)
+    print(f"[Plaid→Loader] Synced {len(results) - failed}/{len(results)} items; counts: {counts}")
+    return {"items": results, "counts": counts}
@@ -0,0 +1,132 @@
+"""
+Result cache for read-only SQL over the ingest tables.
+
+Dashboard queries (daily_spend, transactions, categories, cards) only change
+when a loader commits, and every loader write transaction bumps
+data_version.INGEST. Results are kept per process under (sql, params, that
+counter's generation), so a query is answered from memory until the data
+actually changes -- or the ingest file is replaced by a new one;
+entries for older counter values are never hit again and age out of the LRU,
+which is bounded by settings.QUERY_CACHE_MAX_BYTES.
+
+    with cached_cursor() as cur:
+        cur.execute("SELECT ... FROM daily_spend WHERE user_id = %s", [user_id])
+        rows = cur.fetchall()
+
+Only SELECTs over ingest tables belong here: wallet_* tables are written by
+Django and don't move the counter.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+import data_version
+
+
+class LRUCache:
+    """Thread-safe LRU bounded by the (approximate) bytes of what it holds."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()   # key -> (value, size), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return   # would push out everything else (or the cache is off)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_cache = LRUCache(settings.QUERY_CACHE_MAX_BYTES)
+
+
+class CachedCursor:
+    """
+    The execute/fetchone/fetchall/description subset of a DB-API cursor, with
+    results served from the cache. The ingest counter is read once, on the
+    first execute; before any loader has run nothing is cached.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._generation = None
+        self._generation_read = False
+        self.description = None
+        self._rows = ()
+        self._pos = 0
+
+    def execute(self, sql, params=None):
+        generation = self._current_generation()
+        key = (sql, tuple(params or ()), generation)
+        result = _cache.get(key) if generation is not None else None
+        if result is None:
+            self._cursor.execute(sql, params)
+            result = (self._cursor.description, tuple(self._cursor.fetchall()))
+            if generation is not None:
+                _cache.put(key, result, _sizeof(key, result[1]))
+        self.description, self._rows = result
+        self._pos = 0
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    def fetchall(self):
+        rows = list(self._rows[self._pos:])
+        self._pos = len(self._rows)
+        return rows
+
+    def _current_generation(self):
+        if not self._generation_read:
+            self._generation_read = True
+            try:
+                instance, version = data_version.generation(self._cursor, data_version.INGEST, "%s")
+            except DatabaseError:
+                return None   # no loader has run yet
+            self._generation = None if version is None else (instance, version)
+        return self._generation
+
+
+@contextmanager
+def cached_cursor():
+    """Like connection.cursor(), for read-only queries over the ingest tables."""
+    with connection.cursor() as cur:
+        yield CachedCursor(cur)
+
+
+def _sizeof(key, rows):
+    size = sys.getsizeof(key[0]) + sum(sys.getsizeof(p) for p in key[1]) + sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+    return size
@@ -0,0 +1,60 @@
+"""
+Per-request memo of the user's own rows (goals, wallet cards, subscriptions).
+
+The view, the context processors and anything they call share one
+RequestData, so each dataset is queried at most once per request however many
+places read it. The lists are materialized on first use; anything that writes
+one of these tables mid-request should do so before reading it here, or call
+forget().
+
+    data = request_data(request)
+    for goal in data.goals(): ...
+    if data.subscriptions(): ...
+
+Every read served from the memo is logged at DEBUG level on the
+"wallet.request_data" logger, so with that enabled a repeated fetch that this
+saved (or one that still bypasses it) shows up in the runserver output.
+"""
+import logging
+
+from .models import Card, Goal, Subscription
+
+logger = logging.getLogger(__name__)
+
+
+class RequestData:
+    def __init__(self, user, label=""):
+        self.user = user
+        self.label = label
+        self.hits = {}
+        self._memo = {}
+
+    def goals(self) -> list:
+        """The user's goals, latest period first."""
+        return self._get("goals", lambda: Goal.objects.filter(user=self.user).order_by("-period_start"))
+
+    def cards(self) -> list:
+        """The user's wallet cards (wallet_card)."""
+        return self._get("cards", lambda: Card.objects.filter(user=self.user).order_by("issuer", "name"))
+
+    def subscriptions(self) -> list:
+        return self._get("subscriptions", lambda: Subscription.objects.filter(user=self.user))
+
+    def forget(self, name):
+        """Drop a memoized dataset (after writing its table) so the next read refetches it."""
+        self._memo.pop(name, None)
+
+    def _get(self, name, queryset):
+        if name in self._memo:
+            self.hits[name] = self.hits.get(name, 0) + 1
+            logger.debug("%s: %s served from memo (hit %d)", self.label, name, self.hits[name])
+            return self._memo[name]
+        rows = self._memo[name] = list(queryset())
+        return rows
+
+
+def request_data(request) -> RequestData:
+    """The request's RequestData, created on first use."""
+    if not hasattr(request, "_cached_request_data"):
+        request._cached_request_data = RequestData(request.user, label=request.path)
+    return request._cached_request_data
@@ -1,16 +1,18 @@
 import sqlite3
 
 DB_PATH = "db.sqlite3"
+INGEST_DB_PATH = "ingest.sqlite3"   # raw `cards` table (see sqlite_profile.py)
 
 def copy_cards():
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
+    cur.execute("ATTACH DATABASE ? AS ingest", (INGEST_DB_PATH,))
 
     # Use COALESCE to set base_reward_rate to 1.0 if NULL
     cur.execute("""
         INSERT INTO wallet_card (name, issuer, annual_fee, card_type, base_reward_rate, user_id)
         SELECT card_name, issuer, annual_fee, type, COALESCE(base_reward_rate, 1.0), 1
-        FROM cards
+        FROM ingest.cards
     """)
     conn.commit()
     conn.close()
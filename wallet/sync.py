@@ -0,0 +1,426 @@
+"""
+Keeps the raw Plaid / bills tables fresh without doing the work on the request path.
+
+Views call `sync_if_stale()`, which only *reads* the last sync time and, when it
+is older than settings.PLAID_SYNC_TTL, starts a sync on a background thread:
+bills.json is reloaded if it changed and every linked Plaid item's
+/transactions/sync deltas are written straight into SQLite (wallet/plaid_pull.py).
+The page renders from whatever is already in SQLite. Cron / ops can run the same
+sync synchronously with `python manage.py sync_plaid`.
+
+Only one sync runs at a time across all processes (gunicorn workers, cron): the
+others wait on a lock file next to the DB and then reuse the result of the sync
+that finished while they waited instead of loading again.
+"""
+import json, os, sqlite3, threading, time
+from contextlib import contextmanager
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+import sqlite_profile
+
+SYNC_NAME = "plaid"
+
+_thread_lock = threading.Lock()
+_thread = None
+
+
+def ingest_db_path() -> Path:
+    """The SQLite file the loaders write to (attached to Django's connections as "ingest")."""
+    return Path(settings.INGEST_DB_PATH).resolve()
+
+
+def sync_plaid_to_sqlite(db_path, loader_path, bills_json_path=None, wipe_transactions=False,
+                         plaid=True, on_progress=None, max_workers=None):
+    """
+    Runs your loader on bills.json (optional), then pulls every linked Plaid
+    item's /transactions/sync deltas straight into SQLite (plaid=False skips the
+    pull; on_progress and max_workers are handed to plaid_pull.sync_all_items). The loader upserts
+    by transaction_id, so a plain re-run is safe, and skips files whose content
+    hasn't changed since their last load. wipe_transactions=True is a full
+    rebuild: everything is loaded into a shadow file first and transactions +
+    transaction_categories are swapped in at the end (see _rebuild_via_shadow),
+    so readers never see the tables empty or half loaded.
+    Returns simple table counts plus per-file loader stats under "loads" and the
+    Plaid pull's per-item results (or {"error": ...}) under "plaid".
+    """
+    db_path = str(db_path)
+    json_paths = []
+    if bills_json_path and os.path.exists(str(bills_json_path)):
+        json_paths.append(str(bills_json_path))
+
+    def pull(path):
+        return pull_plaid(path, loader_path, on_progress, max_workers)["items"]
+
+    # 1) Import the loader module from its file path and call load(...)
+    loader_mod = SourceFileLoader("loader_bills", str(loader_path)).load_module()
+    if wipe_transactions:
+        # the Plaid history is pulled into the shadow too, so it survives the swap
+        loads, pulled = _rebuild_via_shadow(loader_mod, json_paths, db_path, pull if plaid else None)
+    else:
+        loads = {Path(p).name: loader_mod.load(p, db_path) for p in json_paths}
+
+        # 2) Plaid deltas since each item's stored cursor; a failed pull is reported,
+        #    not raised, so the file load above still counts as a sync
+        pulled = None
+        if plaid:
+            try:
+                pulled = pull(db_path)
+            except Exception as e:
+                pulled = {"error": str(e)}
+
+    # 3) Return quick counts for debugging
+    conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE)
+    cur = conn.cursor()
+    counts = {}
+    for tbl in ("accounts","transactions","transaction_categories","items","meta","cards"):
+        try:
+            cur.execute(f"SELECT COUNT(*) FROM {tbl}")
+            counts[tbl] = cur.fetchone()[0]
+        except sqlite3.OperationalError:
+            counts[tbl] = 0
+    conn.close()
+    counts["loads"] = loads
+    counts["plaid"] = pulled
+    return counts
+
+
+def pull_plaid(db_path, loader_path, on_progress=None, max_workers=None):
+    """plaid_pull.sync_all_items on db_path: every linked item (a Sandbox item if none yet)."""
+    from . import plaid_pull   # the Plaid SDK is only needed once we actually pull
+    kwargs = {} if on_progress is None else {"on_progress": on_progress}
+    if max_workers is not None:
+        kwargs["max_workers"] = max_workers
+    return plaid_pull.sync_all_items(Path(db_path), Path(loader_path), **kwargs)
+
+
+# Tables a full rebuild replaces wholesale; parents first.
+SHADOW_TABLES = ("transactions", "transaction_categories", "daily_spend")
+SHADOW_SUFFIX = "__next"
+# the shadow DB and what SQLite / a pull into it leave next to it
+SHADOW_FILES = ("", "-journal", "-wal", "-shm", ".sync.lock")
+
+
+def _rebuild_via_shadow(loader_mod, json_paths, db_path, pull=None):
+    """
+    Full rebuild without an empty window:
+      1. seed a fresh shadow DB next to db_path (nobody reads it) with the live
+         items' Plaid links, cursors cleared; load every file into it, then let
+         pull(shadow_path) re-fetch each item's full Plaid history into it;
+      2. copy SHADOW_TABLES into `<table>__next` tables in the live DB, in their
+         own transaction -- readers keep using the current tables meanwhile;
+      3. in ONE short transaction: merge accounts/cards/items/meta/load_manifest
+         from the shadow, DROP the live tables, RENAME the __next ones into place
+         and recreate their indexes/triggers.
+    Readers see either the old snapshot or the new one, never a mix. Every
+    item's cursor becomes the shadow's: where nothing was pulled it is cleared,
+    so the next sync re-sends the Plaid rows the rebuilt tables don't have.
+    A failed pull aborts the rebuild before anything is swapped.
+    Returns (per-file loader stats, pull results or None).
+    """
+    shadow_path = f"{db_path}.shadow"
+    for suffix in SHADOW_FILES:
+        if os.path.exists(shadow_path + suffix):
+            os.remove(shadow_path + suffix)
+
+    try:
+        _seed_shadow(loader_mod, shadow_path, db_path)
+        loads = {Path(p).name: loader_mod.load(p, shadow_path, force=True) for p in json_paths}
+        pulled = pull(shadow_path) if pull else None
+        failed = sorted(item_id for item_id, r in (pulled or {}).items() if "error" in r)
+        if failed:
+            raise RuntimeError(f"Plaid pull failed for {', '.join(failed)}; rebuild abandoned")
+
+        conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE, isolation_level=None)
+        cur = conn.cursor()
+        try:
+            # FK enforcement can only be toggled outside a transaction; with it off the
+            # DROP below doesn't cascade. legacy_alter_table keeps RENAME from rewriting
+            # (or validating) other tables'/views' references to the swapped names.
+            cur.execute("PRAGMA foreign_keys = OFF")
+            cur.execute("PRAGMA legacy_alter_table = ON")
+            cur.execute("ATTACH DATABASE ? AS shadow", (shadow_path,))
+            loader_mod.ensure_schema(cur)
+            cur.execute("PRAGMA foreign_keys = OFF")   # ensure_schema turns it back on
+
+            _build_next_tables(cur)
+            _swap_in_next_tables(cur, loader_mod)
+        finally:
+            conn.close()
+    finally:
+        for suffix in SHADOW_FILES:
+            if os.path.exists(shadow_path + suffix):
+                os.remove(shadow_path + suffix)
+    return loads, pulled
+
+
+def _seed_shadow(loader_mod, shadow_path, db_path):
+    """
+    Create the shadow schema and copy the live items (cursors cleared) and
+    account owners into it, so rows loaded or pulled into the shadow keep
+    whoever owns them now rather than the loader's default user.
+    """
+    conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE, isolation_level=None)
+    try:
+        loader_mod.ensure_schema(conn.cursor())   # the live items may predate access_token/cursor
+    finally:
+        conn.close()
+
+    conn = sqlite_profile.connect(shadow_path, sqlite_profile.INGEST_PROFILE, isolation_level=None)
+    cur = conn.cursor()
+    try:
+        loader_mod.ensure_schema(cur)
+        cur.execute("ATTACH DATABASE ? AS live", (db_path,))
+        cur.execute("""
+            INSERT INTO main.items (item_id, institution_id, webhook, access_token, user_id)
+            SELECT item_id, institution_id, webhook, access_token, user_id FROM live.items
+        """)
+        cur.execute("""
+            INSERT INTO main.accounts (account_id, mask, name, official_name, subtype, type, user_id)
+            SELECT account_id, mask, name, official_name, subtype, type, user_id FROM live.accounts
+        """)
+    finally:
+        conn.close()
+
+
+def _shadow_schema(cur, table, kind="table"):
+    cur.execute("SELECT name, sql FROM shadow.sqlite_master WHERE type = ? AND tbl_name = ? AND sql IS NOT NULL",
+                (kind, table))
+    return cur.fetchall()
+
+
+def _build_next_tables(cur):
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        # the categories dictionary is append-only and shared: merge it by name
+        # (new names fire the pattern-matching trigger) and re-point category_id below
+        cur.execute("INSERT OR IGNORE INTO main.categories (name) SELECT name FROM shadow.categories ORDER BY id")
+        for table in SHADOW_TABLES:
+            (_, create_sql), = _shadow_schema(cur, table)
+            nxt = table + SHADOW_SUFFIX
+            cur.execute(f"DROP TABLE IF EXISTS main.{nxt}")
+            # only the table's own name changes; its FOREIGN KEY still names the live parent
+            cur.execute(create_sql.replace(f"CREATE TABLE {table}", f"CREATE TABLE main.{nxt}", 1))
+            cur.execute(f"PRAGMA shadow.table_info({table})")
+            cols = [r[1] for r in cur.fetchall()]
+            # shadow category ids -> live ids via the name (0 / NULL pass through)
+            select = ", ".join("COALESCE(k.id, x.category_id)" if c == "category_id" else f"x.{c}" for c in cols)
+            cur.execute(f"""
+                INSERT INTO main.{nxt} ({", ".join(cols)})
+                SELECT {select}
+                FROM shadow.{table} x
+                {"LEFT JOIN shadow.categories s ON s.id = x.category_id "
+                 "LEFT JOIN main.categories k ON k.name = s.name" if "category_id" in cols else ""}
+            """)
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+
+
+def _swap_in_next_tables(cur, loader_mod):
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        # accounts (+ mirrored cards), items and meta are upserted, not replaced:
+        # cards carry perks, items carry the Plaid access_token/cursor
+        cur.execute("SELECT account_id, mask, name, official_name, subtype, type, user_id FROM shadow.accounts")
+        cols = [d[0] for d in cur.description]
+        loader_mod.upsert_accounts(cur, [dict(zip(cols, row)) for row in cur.fetchall()])
+
+        cur.execute("SELECT request_id, total_transactions FROM shadow.meta")
+        request_id, total_transactions = cur.fetchone() or (None, None)
+        cur.execute("SELECT item_id, institution_id, webhook, access_token, cursor, user_id FROM shadow.items")
+        cols = [d[0] for d in cur.description]
+        items = [dict(zip(cols, row)) for row in cur.fetchall()] or [{}]
+        for item in items:
+            loader_mod.save_item_meta(cur, item, request_id, total_transactions)
+        # save_item_meta keeps a stored cursor; the live one points past rows we just dropped
+        cur.execute("UPDATE main.items SET cursor = (SELECT s.cursor FROM shadow.items s "
+                    "WHERE s.item_id = main.items.item_id)")
+
+        cur.execute("SELECT name FROM shadow.sqlite_master WHERE type='table' AND name='load_manifest'")
+        if cur.fetchone():
+            loader_mod.load_manifest.ensure_manifest(cur)
+            cur.execute("INSERT OR REPLACE INTO main.load_manifest SELECT * FROM shadow.load_manifest")
+
+        # everyone with spend before or after the swap: their cached alerts are stale
+        cur.execute(f"SELECT user_id FROM main.daily_spend UNION SELECT user_id FROM main.daily_spend{SHADOW_SUFFIX}")
+        for (user_id,) in cur.fetchall():
+            loader_mod.data_version.bump(cur, loader_mod.data_version.spending_key(user_id))
+        loader_mod.data_version.bump(cur, loader_mod.data_version.INGEST)
+
+        # children first on the way out, parents first on the way in
+        for table in reversed(SHADOW_TABLES):
+            cur.execute(f"DROP TABLE IF EXISTS main.{table}")
+        for table in SHADOW_TABLES:
+            cur.execute(f"ALTER TABLE main.{table}{SHADOW_SUFFIX} RENAME TO {table}")
+            for kind in ("index", "trigger"):
+                for _, sql in _shadow_schema(cur, table, kind):
+                    cur.execute(sql)
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+
+
+def _ensure_state_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+          name            TEXT PRIMARY KEY,
+          last_synced_at  REAL,      -- unix time of the last finished sync
+          last_result     TEXT       -- JSON counts from that sync
+        )
+    """)
+
+
+def _last_sync(db_path):
+    """(last_synced_at, last_result) of the last finished sync, or (None, None)."""
+    conn = sqlite_profile.connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT last_synced_at, last_result FROM sync_state WHERE name = ?", (SYNC_NAME,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        conn.close()
+    if not row:
+        return None, None
+    return row[0], json.loads(row[1]) if row[1] else None
+
+
+def last_synced_at(db_path=None):
+    """Unix time of the last finished sync, or None if it never ran."""
+    return _last_sync(db_path or ingest_db_path())[0]
+
+
+def is_stale(db_path=None, ttl=None) -> bool:
+    ttl = settings.PLAID_SYNC_TTL if ttl is None else ttl
+    synced = last_synced_at(db_path)
+    return synced is None or (time.time() - synced) >= ttl
+
+
+try:
+    import fcntl
+except ImportError:      # Windows dev boxes: fall back to an in-process lock
+    fcntl = None
+_local_sync_lock = threading.Lock()
+_held = threading.local()   # lock files the current thread holds
+
+
+@contextmanager
+def sync_lock(db_path):
+    """
+    Exclusive, cross-process lock for syncing into db_path (flock on
+    `<db>.sync.lock`). Blocks until it's free; released on exit or if the
+    holder dies. Re-entrant within a thread: run_sync holds it while
+    plaid_pull, which takes it for its own callers, writes.
+    """
+    lock_path = f"{os.path.realpath(db_path)}.sync.lock"
+    held = getattr(_held, "paths", None)
+    if held is None:
+        held = _held.paths = set()
+    if lock_path in held:
+        yield
+        return
+    held.add(lock_path)
+    try:
+        if fcntl is None:
+            with _local_sync_lock:
+                yield
+            return
+        with open(lock_path, "a") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    finally:
+        held.discard(lock_path)
+
+
+def run_sync(wipe_transactions=False, on_progress=None, max_workers=None):
+    """
+    Reload bills.json and pull Plaid deltas into the ingest DB, and record when it
+    ran. If another process finished a sync while this one waited for the lock,
+    its result is returned instead of syncing again (full rebuilds always run).
+    on_progress(item_id, progress) is called as each Plaid item's pages land;
+    max_workers overrides PLAID_SYNC_WORKERS for the pull.
+    """
+    db_path = ingest_db_path()
+    requested_at = time.time()
+    with sync_lock(db_path):
+        synced, result = _last_sync(db_path)
+        if not wipe_transactions and synced is not None and synced >= requested_at:
+            return result
+        return _run_sync_locked(db_path, wipe_transactions, on_progress, max_workers)
+
+
+def _run_sync_locked(db_path, wipe_transactions, on_progress=None, max_workers=None):
+    base = Path(settings.BASE_DIR)
+    json_bills  = (base / "bills.json").resolve()    # optional
+    loader_path = (base / "load_bills_to_sqlite.py").resolve()
+
+    counts = sync_plaid_to_sqlite(
+        db_path=db_path,
+        loader_path=loader_path,
+        bills_json_path=json_bills if json_bills.exists() else None,
+        wipe_transactions=wipe_transactions,
+        on_progress=on_progress,
+        max_workers=max_workers,
+    )
+
+    from .categories import match_patterns
+    from .models import Goal
+
+    conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE)
+    cur = conn.cursor()
+    # goal texts whose save couldn't resolve them (the DB was busy), or that a
+    # fresh ingest file has never seen
+    match_patterns(cur, Goal.objects.values_list("category", flat=True).distinct(), "?")
+    _ensure_state_table(cur)
+    cur.execute("""
+        INSERT INTO sync_state (name, last_synced_at, last_result)
+        VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+          last_synced_at = excluded.last_synced_at,
+          last_result    = excluded.last_result
+    """, (SYNC_NAME, time.time(), json.dumps(counts)))
+    conn.commit()
+    conn.close()
+    return counts
+
+
+def _run_in_background():
+    try:
+        counts = run_sync()
+        print("[sync] Post-load counts:", counts)
+    except Exception as e:
+        print("[sync] Plaid sandbox sync failed:", e)
+    finally:
+        connections.close_all()   # this thread's own Django connections
+
+
+def sync_if_stale() -> bool:
+    """
+    Kick off a background sync if the data is older than PLAID_SYNC_TTL and this
+    process isn't already syncing. Never blocks the caller; returns True if a
+    sync was started.
+    """
+    global _thread
+    try:
+        if not is_stale():
+            return False
+    except Exception as e:
+        print("[sync] staleness check failed:", e)
+        return False
+
+    with _thread_lock:
+        if _thread is not None and _thread.is_alive():
+            return False
+        _thread = threading.Thread(target=_run_in_background, name="plaid-sync", daemon=True)
+        _thread.start()
+    return True
@@ -1,3 +1,983 @@
-from django.test import TestCase
+import io, json, os, runpy, shutil, sqlite3, tempfile, threading, time
+from contextlib import redirect_stdout
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+import plaid
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ReadTimeoutError
+
+import data_version
+import load_bills_to_sqlite as loader
+import load_deals_to_sqlite
+import load_manifest
+import load_perks_to_sqlite
+import new_load_data
+import sqlite_profile
+from json_stream import iter_items, iter_members
+
+from . import alerts, catalog, categories, context_processors, plaid_pull, query_cache, sync
+from .apps import _configure_sqlite
+from .models import Goal
+from .money import from_cents, to_cents
+from .request_data import request_data
+
+LOADER_PATH = Path(settings.BASE_DIR) / "load_bills_to_sqlite.py"
+
+ACCOUNTS = [
+    {"account_id": "acc_chk", "mask": "0000", "name": "Plaid Checking", "official_name": "Plaid Gold Checking",
+     "subtype": "checking", "type": "depository"},
+    {"account_id": "acc_cc", "mask": "3333", "name": "Chase Sapphire", "official_name": "Chase Sapphire Preferred",
+     "subtype": "credit card", "type": "credit"},
+]
+
+
+def _tx(transaction_id, account_id, amount, day, *categories):
+    return {"transaction_id": transaction_id, "account_id": account_id, "amount": amount, "date": day,
+            "name": transaction_id.upper(), "merchant_name": f"Merchant {transaction_id}",
+            "payment_channel": "in store", "category": list(categories)}
+
+
+TRANSACTIONS = [
+    _tx("t1", "acc_chk", 12.34, "2025-09-01", "Food and Drink", "Restaurants"),
+    _tx("t2", "acc_chk", 5.10, "2025-09-01", "Food and Drink", "Coffee Shop"),
+    _tx("t3", "acc_cc", 100.00, "2025-09-02", "Travel", "Airlines"),
+    _tx("t4", "acc_cc", 0.1, "2025-09-03", "Shops"),
+    _tx("t5", "acc_chk", 7.25, "2025-09-03"),
+]
+
+
+class TempDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def write_json(self, name, data):
+        path = self.tmp / name
+        path.write_text(json.dumps(data), encoding="utf-8")
+        return str(path)
+
+    def connect(self, db_path):
+        conn = sqlite_profile.connect(db_path, sqlite_profile.INGEST_PROFILE, isolation_level=None)
+        self.addCleanup(conn.close)
+        return conn
+
+
+def rollup_mismatches(cur):
+    """daily_spend rows that differ from aggregating transactions from scratch (both directions)."""
+    cur.execute("""
+        SELECT user_id, day_num, account_id, 0, SUM(amount_cents), COUNT(*)
+          FROM transactions WHERE user_id IS NOT NULL
+         GROUP BY user_id, day_num, account_id
+        UNION ALL
+        SELECT t.user_id, t.day_num, t.account_id, k.id, SUM(t.amount_cents), COUNT(*)
+          FROM transactions t JOIN categories k ON k.name = t.primary_category
+         WHERE t.user_id IS NOT NULL
+         GROUP BY t.user_id, t.day_num, t.account_id, k.id
+    """)
+    expected = set(cur.fetchall())
+    cur.execute("SELECT user_id, day_num, account_id, category_id, total_cents, count FROM daily_spend")
+    actual = set(cur.fetchall())
+    return expected ^ actual
+
+
+class JsonStreamTests(SimpleTestCase):
+    DOC = {
+        "accounts": [{"account_id": "aé\"1", "balances": {"current": 1234.5678, "limit": None}}],
+        "transactions": [
+            {"transaction_id": f"t{i}", "amount": i * 10.25 - 3, "date": "2025-01-01",
+             "category": ["Food", "Coffee \\ Tea"], "pending": i % 2 == 0}
+            for i in range(40)
+        ],
+        "total_transactions": 123456789,
+        "ratio": -2.5e-3,
+        "item": {"item_id": "it", "nested": [[1, 2], {"x": [True, False, None]}]},
+        "empty": [],
+    }
+
+    def test_members_match_json_load_at_every_chunk_boundary(self):
+        text = json.dumps(self.DOC, indent=1)
+        for chunk_size in (1, 2, 3, 5, 7, 16, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                got = {}
+                for key, value in iter_members(io.StringIO(text), stream_keys=("transactions", "empty"),
+                                               chunk_size=chunk_size):
+                    got[key] = list(value) if key in ("transactions", "empty") else value
+                self.assertEqual(got, self.DOC)
+
+    def test_numbers_split_across_chunks(self):
+        text = "[12345678901234, 1.5e10, -0.000123, 7]"
+        for chunk_size in range(1, 12):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_items(io.StringIO(text), chunk_size=chunk_size)),
+                                 [12345678901234, 1.5e10, -0.000123, 7])
+
+    def test_unconsumed_stream_is_skipped(self):
+        text = json.dumps({"transactions": [{"a": 1}, {"a": 2}], "request_id": "r"})
+        seen = {}
+        for key, value in iter_members(io.StringIO(text), stream_keys=("transactions",), chunk_size=4):
+            seen[key] = next(value) if key == "transactions" else value
+        self.assertEqual(seen, {"transactions": {"a": 1}, "request_id": "r"})
+
+    def test_malformed_input_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_members(io.StringIO('{"a": [1, 2}'), stream_keys=("a",)))
+
+
+class SqliteProfileTests(TempDirMixin, SimpleTestCase):
+    def pragmas(self, conn, schema="main"):
+        return {p: conn.execute(f"PRAGMA {schema}.{p}").fetchone()[0]
+                for p in ("journal_mode", "synchronous", "cache_size")}
+
+    def test_connect_applies_the_profile(self):
+        conn = self.connect(self.tmp / "a.sqlite3")
+        self.assertEqual(self.pragmas(conn), {"journal_mode": "wal", "synchronous": 1, "cache_size": -131072})
+        self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone(), (60000,))
+
+    def test_attached_database_gets_the_per_schema_pragmas(self):
+        conn = self.connect(self.tmp / "a.sqlite3")
+        sqlite_profile.attach(conn, self.tmp / "b.sqlite3", "b", "legacy")
+        sqlite_profile.attach(conn, self.tmp / "b.sqlite3", "b", "legacy")   # no-op when attached
+        self.assertEqual(self.pragmas(conn, "b"), {"journal_mode": "delete", "synchronous": 2, "cache_size": -2000})
+        self.assertEqual(self.pragmas(conn)["journal_mode"], "wal")
+
+    def test_django_connections_use_the_configured_profile(self):
+        connection.ensure_connection()
+        expected = sqlite_profile.PROFILES[settings.SQLITE_PROFILE]
+        self.assertEqual(connection.connection.execute("PRAGMA busy_timeout").fetchone(),
+                         (expected["busy_timeout"],))
+        databases = {row[1] for row in connection.connection.execute("PRAGMA database_list")}
+        self.assertIn(settings.INGEST_DB_ALIAS, databases)
+
+    def test_ingest_db_is_not_the_real_one_under_test(self):
+        self.assertNotEqual(Path(settings.INGEST_DB_PATH).parent, Path(settings.BASE_DIR))
+
+    def test_ingest_tables_left_in_the_django_db_are_refused(self):
+        conn = self.connect(self.tmp / "db.sqlite3")
+        fake = SimpleNamespace(vendor="sqlite", connection=conn)
+        _configure_sqlite(None, fake)
+        conn.execute("DETACH DATABASE ingest")
+        conn.execute("CREATE TABLE main.transactions (transaction_id TEXT)")
+        with self.assertRaisesMessage(ImproperlyConfigured, "split_ingest_db"):
+            _configure_sqlite(None, fake)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            sqlite_profile.connect(self.tmp / "a.sqlite3", "fast")
+
+
+class MoneyTests(TempDirMixin, SimpleTestCase):
+    def test_to_cents_rounds_half_up(self):
+        self.assertEqual(to_cents(0.1), 10)
+        self.assertEqual(to_cents("19.995"), 2000)
+        self.assertEqual(to_cents(Decimal("1.005")), 101)
+        self.assertEqual(to_cents(-2.675), -268)
+        self.assertEqual((to_cents(None), to_cents("")), (0, 0))
+        self.assertEqual((from_cents(1999), from_cents(None)), (19.99, 0))
+
+    def test_cent_sums_are_exact(self):
+        db = str(self.tmp / "ingest.sqlite3")
+        loader.load(self.write_json("bills.json", {"accounts": ACCOUNTS, "transactions": [
+            _tx(f"c{n}", "acc_chk", amount, "2025-09-01") for n, amount in enumerate((0.1, 0.2, 0.7))
+        ]}), db)
+        cur = self.connect(db).cursor()
+        cur.execute("SELECT SUM(amount_cents) FROM transactions WHERE transaction_id LIKE 'c_'")
+        (cents,) = cur.fetchone()
+        self.assertEqual((cents, type(cents)), (100, int))
+        cur.execute("SELECT total_cents FROM daily_spend WHERE day = '2025-09-01' AND category_id = 0")
+        self.assertEqual(cur.fetchall(), [(100,)])
+
+    def test_loadbillsjson_loads_through_the_bills_loader(self):
+        bills = self.write_json("bills.json", {"accounts": ACCOUNTS, "transactions": TRANSACTIONS})
+        old, new = str(self.tmp / "old.sqlite3"), str(self.tmp / "new.sqlite3")
+        script = str(Path(settings.BASE_DIR) / "loadbillsjson.py")
+        with mock.patch("sys.argv", [script, bills, old]), redirect_stdout(io.StringIO()):
+            runpy.run_path(script, run_name="__main__")
+        loader.load(bills, new)
+
+        def rows(db):
+            cur = self.connect(db).cursor()
+            cur.execute("SELECT transaction_id, amount_cents, user_id FROM transactions ORDER BY 1")
+            transactions = cur.fetchall()
+            cur.execute("SELECT user_id, day, account_id, category_id, total_cents, count "
+                        "FROM daily_spend ORDER BY 1, 2, 3, 4")
+            return transactions, cur.fetchall()
+
+        self.assertEqual(rows(old), rows(new))
+        with mock.patch("sys.argv", [script, bills, old]), redirect_stdout(io.StringIO()) as out, \
+                self.assertRaises(SystemExit):
+            runpy.run_path(script, run_name="__main__")
+        self.assertIn("Skipped", out.getvalue())
+
+
+class DeltaAndRollupTests(TempDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = str(self.tmp / "ingest.sqlite3")
+        loader.load(self.write_json("bills.json", {"accounts": ACCOUNTS, "transactions": TRANSACTIONS}), self.db)
+        self.cur = self.connect(self.db).cursor()
+
+    def day_total(self, day):
+        self.cur.execute("SELECT COALESCE(SUM(total_cents), 0) FROM daily_spend WHERE day = ? AND category_id = 0",
+                         (day,))
+        return self.cur.fetchone()[0]
+
+    def test_load_builds_exact_rollup(self):
+        self.assertEqual(rollup_mismatches(self.cur), set())
+        self.assertEqual(self.day_total("2025-09-01"), 1234 + 510)
+        self.assertEqual(self.day_total("2025-09-03"), 10 + 725)
+
+    def test_apply_deltas(self):
+        self.cur.execute("BEGIN IMMEDIATE")
+        applied = loader.apply_transaction_deltas(
+            self.cur,
+            added=[_tx("t6", "acc_cc", 20.00, "2025-09-02", "Travel", "Taxi")],
+            # t1 moves to another day with a new amount and category
+            modified=[_tx("t1", "acc_chk", 40.00, "2025-09-04", "Shops", "Books")],
+            removed_ids=["t3", "missing"],
+        )
+        self.cur.execute("COMMIT")
+
+        self.assertEqual(applied, {"added": 1, "modified": 1, "removed": 1})
+        self.cur.execute("SELECT transaction_id FROM transactions WHERE transaction_id LIKE 't%' ORDER BY 1")
+        self.assertEqual([r[0] for r in self.cur.fetchall()], ["t1", "t2", "t4", "t5", "t6"])
+        self.cur.execute("SELECT amount_cents, date, primary_category, category_path, day_num "
+                         "FROM transactions WHERE transaction_id = 't1'")
+        self.assertEqual(self.cur.fetchone(), (4000, "2025-09-04", "Shops", "Shops / Books",
+                                               date(2025, 9, 4).toordinal()))
+        self.cur.execute("SELECT category FROM transaction_categories WHERE transaction_id = 't1' ORDER BY idx")
+        self.assertEqual([r[0] for r in self.cur.fetchall()], ["Shops", "Books"])
+        self.cur.execute("SELECT COUNT(*) FROM transaction_categories WHERE transaction_id = 't3'")
+        self.assertEqual(self.cur.fetchone()[0], 0)
+
+        # the old day, the new day and the removed row's day are all re-aggregated
+        self.assertEqual(rollup_mismatches(self.cur), set())
+        self.assertEqual(self.day_total("2025-09-01"), 510)
+        self.assertEqual(self.day_total("2025-09-02"), 2000)
+        self.assertEqual(self.day_total("2025-09-04"), 4000)
+
+    def test_load_sync_shaped_file(self):
+        path = self.write_json("sync.json", {
+            "added": [_tx("t6", "acc_cc", 20.00, "2025-09-02", "Travel", "Taxi")],
+            "modified": [_tx("t1", "acc_chk", 40.00, "2025-09-04", "Shops")],
+            "removed": [{"transaction_id": "t3"}],
+            "next_cursor": "c2",
+        })
+        stats = loader.load(path, self.db)
+
+        self.assertEqual((stats["transactions"], stats["removed"]), (2, 1))
+        self.assertEqual(rollup_mismatches(self.cur), set())
+        self.assertEqual(self.day_total("2025-09-02"), 2000)
+        self.assertEqual(self.day_total("2025-09-04"), 4000)
+
+    def test_unknown_array_is_refused(self):
+        path = self.write_json("odd.json", {"transactions": [_tx("t7", "acc_chk", 1, "2025-09-05")],
+                                            "pending": [_tx("t8", "acc_chk", 2, "2025-09-05")]})
+        with self.assertRaisesRegex(ValueError, "pending"):
+            loader.load(path, self.db)
+        self.cur.execute("SELECT COUNT(*) FROM transactions WHERE transaction_id = 't7'")
+        self.assertEqual(self.cur.fetchone()[0], 0)
+
+    def test_rollup_of_many_days_stays_under_the_bound_parameter_limit(self):
+        self.cur.connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, loader.IN_CHUNK)
+        first = date(2024, 1, 1).toordinal()
+        added = [_tx(f"d{n}", "acc_cc", 1, date.fromordinal(first + n).isoformat(), "Shops")
+                 for n in range(loader.IN_CHUNK + 1)]
+        self.cur.execute("BEGIN IMMEDIATE")
+        loader.apply_transaction_deltas(self.cur, added=added)
+        self.cur.execute("COMMIT")
+        self.assertEqual(rollup_mismatches(self.cur), set())
+
+    def test_replaying_a_delta_is_idempotent(self):
+        delta = dict(added=[_tx("t6", "acc_cc", 20.00, "2025-09-02", "Travel")], removed_ids=["t2"])
+        for _ in range(2):
+            self.cur.execute("BEGIN IMMEDIATE")
+            loader.apply_transaction_deltas(self.cur, **delta)
+            self.cur.execute("COMMIT")
+        self.assertEqual(rollup_mismatches(self.cur), set())
+        self.assertEqual(self.day_total("2025-09-02"), 10000 + 2000)
+
+
+class ShadowSwapTests(TempDirMixin, SimpleTestCase):
+    TABLES = sync.SHADOW_TABLES
+
+    def setUp(self):
+        super().setUp()
+        self.db = str(self.tmp / "ingest.sqlite3")
+        self.bills = self.write_json("bills.json", {"accounts": ACCOUNTS, "transactions": TRANSACTIONS})
+        loader.load(self.bills, self.db)
+
+    def schema(self, cur):
+        """Columns, indexes and triggers of the swapped tables (RENAME re-quotes CREATE TABLE's text)."""
+        marks = ",".join("?" * len(self.TABLES))
+        cur.execute(f"SELECT type, name, tbl_name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') "
+                    f"AND tbl_name IN ({marks}) AND sql IS NOT NULL ORDER BY type, name", self.TABLES)
+        schema = cur.fetchall()
+        for table in self.TABLES:
+            cur.execute(f"PRAGMA table_xinfo({table})")
+            schema.append((table, cur.fetchall()))
+            cur.execute(f"PRAGMA foreign_key_list({table})")
+            schema.append((table, cur.fetchall()))
+        return schema
+
+    def rows(self, cur):
+        """Every row of the swapped tables, with category ids replaced by names."""
+        cur.execute("SELECT * FROM transactions ORDER BY transaction_id")
+        transactions = cur.fetchall()
+        cur.execute("""SELECT c.transaction_id, c.idx, c.category, k.name FROM transaction_categories c
+                       LEFT JOIN categories k ON k.id = c.category_id ORDER BY 1, 2""")
+        categories = cur.fetchall()
+        cur.execute("""SELECT d.user_id, d.day_num, d.account_id, COALESCE(k.name, d.category_id), d.day,
+                              d.week, d.month, d.total_cents, d.count
+                         FROM daily_spend d LEFT JOIN categories k ON k.id = d.category_id ORDER BY 1, 2, 3, 4""")
+        return transactions, categories, cur.fetchall()
+
+    def rebuild(self):
+        return sync.sync_plaid_to_sqlite(self.db, LOADER_PATH, bills_json_path=self.bills,
+                                         wipe_transactions=True, plaid=False)
+
+    def test_rebuild_matches_a_fresh_load(self):
+        cur = self.connect(self.db).cursor()
+        schema_before = self.schema(cur)
+        # a row the files no longer contain, and a stray rollup row: a rebuild drops both
+        cur.execute("""INSERT INTO transactions (transaction_id, account_id, amount, date, amount_cents, day_num,
+                                                 week, month, user_id)
+                       VALUES ('stale', 'acc_chk', 1, '2025-09-01', 100, ?, 0, 202509, 1)""",
+                    (date(2025, 9, 1).toordinal(),))
+        cur.execute("INSERT INTO daily_spend VALUES (1, 5, 'acc_chk', 0, '0001-01-05', 0, 101, 1, 1)")
+
+        self.rebuild()
+
+        fresh = str(self.tmp / "fresh.sqlite3")
+        loader.load(self.bills, fresh)
+        self.assertEqual(self.rows(cur), self.rows(self.connect(fresh).cursor()))
+        self.assertEqual(self.schema(cur), schema_before)
+        self.assertEqual(rollup_mismatches(cur), set())
+        cur.execute("SELECT name FROM sqlite_master WHERE name LIKE ?", (f"%{sync.SHADOW_SUFFIX}",))
+        self.assertEqual(cur.fetchall(), [])
+        self.assertFalse(os.path.exists(f"{self.db}.shadow"))
+
+    def test_rebuild_keeps_item_link(self):
+        cur = self.connect(self.db).cursor()
+        cur.execute("INSERT INTO items (item_id, access_token, cursor, user_id) VALUES ('it', 'tok', 'c1', 1)")
+        self.rebuild()
+        # nothing was pulled, so the cursor is cleared and the next sync re-sends the Plaid rows
+        cur.execute("SELECT item_id, access_token, cursor, user_id FROM items")
+        self.assertEqual(cur.fetchall(), [("it", "tok", None, 1)])
+
+    def fake_pull(self, path, loader_path, on_progress=None, max_workers=None):
+        """Stands in for plaid_pull.sync_all_items: one Plaid-only transaction, then the new cursor."""
+        cur = self.connect(path).cursor()
+        cur.execute("SELECT item_id, access_token, cursor FROM items")
+        self.pulled_items = cur.fetchall()
+        cur.execute("BEGIN IMMEDIATE")
+        loader.apply_transaction_deltas(cur, added=[_tx("p1", "acc_chk", 3.00, "2025-09-02", "Shops")])
+        cur.execute("UPDATE items SET cursor = 'c9'")
+        cur.execute("COMMIT")
+        return {"items": {"it": {"done": True}}}
+
+    def test_rebuild_repulls_plaid_history(self):
+        cur = self.connect(self.db).cursor()
+        cur.execute("INSERT INTO items (item_id, access_token, cursor, user_id) VALUES ('it', 'tok', 'c1', 1)")
+        with mock.patch.object(sync, "pull_plaid", self.fake_pull):
+            counts = sync.sync_plaid_to_sqlite(self.db, LOADER_PATH, bills_json_path=self.bills,
+                                               wipe_transactions=True)
+
+        self.assertEqual(self.pulled_items, [("it", "tok", None)])   # from the start of the history
+        self.assertEqual(counts["plaid"], {"it": {"done": True}})
+        cur.execute("SELECT amount_cents FROM transactions WHERE transaction_id = 'p1'")
+        self.assertEqual(cur.fetchone(), (300,))
+        cur.execute("SELECT cursor FROM items")
+        self.assertEqual(cur.fetchall(), [("c9",)])
+        self.assertEqual(rollup_mismatches(cur), set())
+
+    def test_failed_pull_abandons_rebuild(self):
+        cur = self.connect(self.db).cursor()
+        cur.execute("INSERT INTO items (item_id, access_token, cursor, user_id) VALUES ('it', 'tok', 'c1', 1)")
+        before = self.rows(cur)
+        with mock.patch.object(sync, "pull_plaid", return_value={"items": {"it": {"error": "ITEM_LOGIN_REQUIRED"}}}):
+            with self.assertRaisesRegex(RuntimeError, "it"):
+                sync.sync_plaid_to_sqlite(self.db, LOADER_PATH, bills_json_path=self.bills, wipe_transactions=True)
+        self.assertEqual(self.rows(cur), before)
+        cur.execute("SELECT cursor FROM items")
+        self.assertEqual(cur.fetchall(), [("c1",)])
+        self.assertFalse(os.path.exists(f"{self.db}.shadow"))
+
+
+class OwnershipTests(TempDirMixin, SimpleTestCase):
+    """A reload or rebuild under the default user must not take accounts from whoever owns them."""
+
+    def setUp(self):
+        super().setUp()
+        self.db = str(self.tmp / "ingest.sqlite3")
+        self.bills = self.write_json("bills.json", {"accounts": ACCOUNTS, "transactions": TRANSACTIONS,
+                                                    "item": {"item_id": "it"}})
+        loader.load(self.bills, self.db, user_id=7)
+        self.cur = self.connect(self.db).cursor()
+
+    def owners(self):
+        found = {}
+        for table in ("accounts", "transactions", "daily_spend", "items", "cards"):
+            self.cur.execute(f"SELECT DISTINCT user_id FROM {table}")
+            found[table] = {r[0] for r in self.cur.fetchall()}
+        return found
+
+    def test_reload_keeps_owner(self):
+        loader.load(self.bills, self.db, force=True)
+        self.assertEqual(self.owners(), dict.fromkeys(("accounts", "transactions", "daily_spend", "items", "cards"),
+                                                      {7}))
+
+    def test_rebuild_keeps_owner(self):
+        sync.sync_plaid_to_sqlite(self.db, LOADER_PATH, bills_json_path=self.bills, wipe_transactions=True,
+                                  plaid=False)
+        self.assertEqual(self.owners(), dict.fromkeys(("accounts", "transactions", "daily_spend", "items", "cards"),
+                                                      {7}))
+
+    def test_reassign_moves_everything(self):
+        loader.load(self.bills, self.db, user_id=3, reassign=True)
+        self.assertEqual(self.owners(), dict.fromkeys(("accounts", "transactions", "daily_spend", "items", "cards"),
+                                                      {3}))
+        self.assertEqual(rollup_mismatches(self.cur), set())
+
+
+class FeaturedDealsTests(TempDirMixin, SimpleTestCase):
+    DEALS = str(Path(settings.BASE_DIR) / "deals_data.json")
+    PERKS = str(Path(settings.BASE_DIR) / "perk_data.json")
+
+    def setUp(self):
+        super().setUp()
+        self.db = str(self.tmp / "ingest.sqlite3")
+        self.cur = self.connect(self.db).cursor()
+
+    def deal_types(self):
+        self.cur.execute("SELECT deal_type, COUNT(*) FROM deals GROUP BY deal_type")
+        return dict(self.cur.fetchall())
+
+    def featured(self):
+        return sum(n for t, n in self.deal_types().items() if t not in load_deals_to_sqlite.DEAL_TYPES)
+
+    def test_unchanged_file_is_skipped(self):
+        self.assertEqual(new_load_data.load(self.DEALS, self.db)["status"], load_manifest.LOADED)
+        self.assertEqual(new_load_data.load(self.DEALS, self.db)["status"], load_manifest.SKIPPED)
+        self.assertEqual(self.featured(), 12)
+
+    def test_reload_replaces_its_own_deals(self):
+        new_load_data.load(self.DEALS, self.db)
+        new_load_data.load(self.DEALS, self.db, force=True)
+        self.assertEqual(self.featured(), 12)
+
+    def test_perk_deals_and_featured_deals_coexist(self):
+        new_load_data.load(self.DEALS, self.db)
+        load_deals_to_sqlite.load(self.PERKS, self.db)
+        load_deals_to_sqlite.load(self.PERKS, self.db, force=True)
+        self.assertEqual(self.featured(), 12)
+        self.assertTrue(set(load_deals_to_sqlite.DEAL_TYPES) & set(self.deal_types()))
+
+
+class SyncTests(TempDirMixin, SimpleTestCase):
+    databases = {"default"}   # run_sync resolves the goals' category patterns
+
+    def setUp(self):
+        super().setUp()
+        self.db = str(self.tmp / "ingest.sqlite3")
+        self.bills = self.write_json("bills.json", {"accounts": ACCOUNTS, "transactions": TRANSACTIONS})
+
+    def test_sync_loads_bills_then_pulls_plaid(self):
+        with mock.patch.object(sync, "pull_plaid", return_value={"items": {"it": {"done": True}}}) as pull:
+            counts = sync.sync_plaid_to_sqlite(self.db, LOADER_PATH, bills_json_path=self.bills)
+        pull.assert_called_once_with(self.db, LOADER_PATH, None, None)
+        self.assertEqual(counts["loads"]["bills.json"]["transactions"], len(TRANSACTIONS))
+        self.assertEqual(counts["plaid"], {"it": {"done": True}})
+
+    def test_failed_pull_is_reported(self):
+        with mock.patch.object(sync, "pull_plaid", side_effect=RuntimeError("no credentials")):
+            counts = sync.sync_plaid_to_sqlite(self.db, LOADER_PATH, bills_json_path=self.bills)
+        self.assertEqual(counts["plaid"], {"error": "no credentials"})
+        self.assertEqual(counts["loads"]["bills.json"]["transactions"], len(TRANSACTIONS))
+
+
+    def test_sync_lock_is_reentrant_per_thread(self):
+        entered = threading.Event()
+
+        def other_sync():
+            with sync.sync_lock(self.db):
+                entered.set()
+
+        with sync.sync_lock(self.db):
+            with sync.sync_lock(self.db):   # run_sync -> plaid_pull.sync_all_items
+                thread = threading.Thread(target=other_sync)
+                thread.start()
+                self.assertFalse(entered.wait(0.2))
+        self.assertTrue(entered.wait(5))
+        thread.join()
+
+    def test_run_sync_returns_a_sync_that_finished_while_it_waited(self):
+        waiter = {}
+
+        def first_sync(*args, **kwargs):
+            if not waiter:
+                waiter["thread"] = threading.Thread(target=lambda: waiter.setdefault("result", sync.run_sync()))
+                waiter["thread"].start()
+                time.sleep(0.2)   # the second request blocks on the lock
+            return {"calls": fake.call_count}
+
+        loader.ensure_schema(self.connect(self.db).cursor())
+        with override_settings(INGEST_DB_PATH=self.db), \
+                mock.patch.object(sync, "sync_plaid_to_sqlite", side_effect=first_sync) as fake:
+            self.assertEqual(sync.run_sync(), {"calls": 1})
+            waiter["thread"].join()
+            self.assertEqual(waiter["result"], {"calls": 1})
+            self.assertEqual(fake.call_count, 1)
+
+            self.assertEqual(sync.run_sync(), {"calls": 2})
+            self.assertEqual(sync.run_sync(wipe_transactions=True), {"calls": 3})
+
+
+class FakePlaidApi:
+    """
+    Stands in for plaid_api.PlaidApi. /accounts/get returns ACCOUNTS;
+    /transactions/sync serves pages[access_token][cursor] =
+    (added, modified, removed ids, next_cursor, has_more), with transactions in
+    _tx's shape. errors[(access_token, cursor)] is raised once, before that page.
+    """
+
+    def __init__(self, pages, errors=None):
+        self.pages = pages
+        self.errors = dict(errors or {})
+        self.calls = []   # (access_token, cursor) of every /transactions/sync
+        self.lock = threading.Lock()
+
+    def accounts_get(self, request, _request_timeout=None):
+        return SimpleNamespace(accounts=[SimpleNamespace(**a) for a in ACCOUNTS])
+
+    def transactions_sync(self, request, _request_timeout=None):
+        key = (request.access_token, request.get("cursor"))
+        with self.lock:
+            self.calls.append(key)
+            error = self.errors.pop(key, None)
+        if error:
+            raise error
+        added, modified, removed, next_cursor, has_more = self.pages[key[0]][key[1]]
+        return SimpleNamespace(added=[SimpleNamespace(**t) for t in added],
+                               modified=[SimpleNamespace(**t) for t in modified],
+                               removed=[SimpleNamespace(transaction_id=t) for t in removed],
+                               next_cursor=next_cursor, has_more=has_more, request_id="req")
+
+
+class PlaidSyncTests(TempDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = self.tmp / "ingest.sqlite3"
+        self.cur = self.connect(str(self.db)).cursor()
+        loader.ensure_schema(self.cur)
+
+    def link(self, item_id, access_token, cursor=None):
+        self.cur.execute("INSERT INTO items (item_id, access_token, cursor, user_id) VALUES (?, ?, ?, 1)",
+                         (item_id, access_token, cursor))
+
+    def sync(self, api, run=plaid_pull.sync_plaid_to_sqlite, **kwargs):
+        with mock.patch.object(plaid_pull, "_plaid_client", return_value=api), redirect_stdout(io.StringIO()):
+            return run(self.db, LOADER_PATH, **kwargs)
+
+    def cursor_of(self, item_id):
+        self.cur.execute("SELECT cursor FROM items WHERE item_id = ?", (item_id,))
+        return self.cur.fetchone()[0]
+
+    def transaction_ids(self):
+        self.cur.execute("SELECT transaction_id FROM transactions WHERE transaction_id LIKE 't%' ORDER BY 1")
+        return [r[0] for r in self.cur.fetchall()]
+
+    def test_resumes_from_the_stored_cursor(self):
+        self.link("it", "tok", cursor="c1")
+        api = FakePlaidApi({"tok": {
+            "c1": ([TRANSACTIONS[0]], [], [], "c2", True),
+            "c2": ([TRANSACTIONS[1]], [], [], "c3", False),
+            "c3": ([], [TRANSACTIONS[2]], ["t1"], "c4", False),
+        }})
+
+        counts = self.sync(api)
+        self.assertEqual(api.calls, [("tok", "c1"), ("tok", "c2")])   # never the full history
+        self.assertEqual(counts["deltas"]["added"], 2)
+        self.assertEqual(self.cursor_of("it"), "c3")
+
+        self.sync(api)   # the next sync only asks for what changed since
+        self.assertEqual(api.calls[2:], [("tok", "c3")])
+        self.assertEqual(self.transaction_ids(), ["t2", "t3"])
+        self.assertEqual(self.cursor_of("it"), "c4")
+        self.assertEqual(rollup_mismatches(self.cur), set())
+
+    def api_error(self, code):
+        e = plaid.ApiException(status=400, reason="Bad Request")
+        e.body = json.dumps({"error_code": code})
+        return e
+
+    def test_mutation_during_pagination_restarts_from_the_original_cursor(self):
+        self.link("it", "tok", cursor="c1")
+        pages = {"tok": {
+            "c1": ([TRANSACTIONS[0]], [], [], "c2", True),
+            "c2": ([TRANSACTIONS[1]], [], [], "c3", False),
+        }}
+        api = FakePlaidApi(pages, errors={("tok", "c2"): self.api_error("TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION")})
+
+        counts = self.sync(api)
+        self.assertEqual(api.calls, [("tok", "c1"), ("tok", "c2"), ("tok", "c1"), ("tok", "c2")])
+        self.assertEqual((counts["deltas"]["pages"], counts["deltas"]["added"]), (2, 2))
+        self.assertEqual(self.transaction_ids(), ["t1", "t2"])
+        self.assertEqual(self.cursor_of("it"), "c3")
+
+    def test_pages_commit_one_by_one_and_the_cursor_last(self):
+        self.link("it", "tok", cursor="c1")
+        pages = {"tok": {
+            "c1": ([TRANSACTIONS[0]], [], [], "c2", True),
+            "c2": ([TRANSACTIONS[1]], [], [], "c3", False),
+        }}
+        api = FakePlaidApi(pages, errors={("tok", "c2"): self.api_error("INTERNAL_SERVER_ERROR")})
+
+        with self.assertRaises(plaid.ApiException):
+            self.sync(api)
+        # page 1 is in; the cursor isn't, so the next sync replays it (deltas are idempotent)
+        self.assertEqual(self.transaction_ids(), ["t1"])
+        self.assertEqual(self.cursor_of("it"), "c1")
+
+        self.sync(api)
+        self.assertEqual(self.transaction_ids(), ["t1", "t2"])
+        self.assertEqual(self.cursor_of("it"), "c3")
+        self.assertEqual(rollup_mismatches(self.cur), set())
+
+
+    def test_sync_all_items_runs_items_in_parallel(self):
+        for n in range(3):
+            self.link(f"it{n}", f"tok{n}")
+        pages = {f"tok{n}": {None: ([TRANSACTIONS[n]], [], [], f"c{n}", False)} for n in range(3)}
+        pages["tok2"] = {}   # unknown cursor: this item fails, the others still land
+        api = FakePlaidApi(pages)
+        # every worker must be inside /transactions/sync at the same time to get past this
+        barrier = threading.Barrier(3, timeout=5)
+        serve = api.transactions_sync
+        api.transactions_sync = lambda request, **kw: (barrier.wait(), serve(request, **kw))[1]
+        progress = []
+
+        result = self.sync(api, plaid_pull.sync_all_items, max_workers=3,
+                           on_progress=lambda item_id, p: progress.append((item_id, p["done"])))
+
+        self.assertEqual(sorted(result["items"]), ["it0", "it1", "it2"])
+        self.assertIn("error", result["items"]["it2"])
+        self.assertEqual(result["items"]["it0"]["added"], 1)
+        self.assertEqual(self.transaction_ids(), ["t1", "t2"])
+        self.assertEqual([self.cursor_of(f"it{n}") for n in range(3)], ["c0", "c1", None])
+        self.assertEqual(sorted(p for p in progress if p[1]), [("it0", True), ("it1", True)])
+
+
+class PlaidRetryTests(SimpleTestCase):
+    def retry(self):
+        return plaid_pull._IdempotentRetry(total=3, backoff_factor=0, status_forcelist=(429, 503),
+                                           allowed_methods=None, raise_on_status=False)
+
+    def response(self, status):
+        return mock.Mock(status=status, headers={}, get_redirect_location=lambda: False)
+
+    def test_only_idempotent_endpoints_are_retried(self):
+        error = ReadTimeoutError(None, "/", "read timed out")
+        for path in ("/transactions/sync", "/accounts/get", "/sandbox/public_token/create"):
+            self.assertEqual(self.retry().increment("POST", path, error=error).total, 2)
+        # the public_token is single-use: a second exchange would fail or link twice
+        with self.assertRaises(MaxRetryError):
+            self.retry().increment("POST", "/item/public_token/exchange", error=error)
+        with self.assertRaises(MaxRetryError):
+            self.retry().increment("POST", "/item/public_token/exchange", response=self.response(503))
+
+    def test_unsent_requests_are_retried_anywhere(self):
+        error = NewConnectionError(None, "connection refused")
+        retry = self.retry().increment("POST", "https://sandbox.plaid.com/item/public_token/exchange", error=error)
+        self.assertEqual(retry.total, 2)
+
+    def test_a_resend_takes_a_rate_limit_token(self):
+        with mock.patch.object(plaid_pull._limiter, "acquire") as acquire:
+            self.retry().increment("POST", "/transactions/sync", response=self.response(429)).sleep()
+        acquire.assert_called_once_with()
+
+
+class IngestConnectionMixin(TempDirMixin):
+    """Point Django's "ingest" attachment at a throwaway file for the test."""
+    databases = {"default"}
+
+    def setUp(self):
+        super().setUp()
+        connection.ensure_connection()
+        alias = settings.INGEST_DB_ALIAS
+        self.addCleanup(sqlite_profile.attach, connection.connection, settings.INGEST_DB_PATH, alias)
+        self.addCleanup(connection.connection.execute, f"DETACH DATABASE {alias}")
+        self.attach_new_ingest_db("ingest.sqlite3")
+
+    def attach_new_ingest_db(self, name):
+        """Swap in an empty ingest file (schema only), as if the old one was deleted."""
+        self.db = str(self.tmp / name)
+        conn = self.connect(self.db)
+        load_deals_to_sqlite.ensure_schema(conn.cursor())
+        loader.ensure_schema(conn.cursor())
+        load_perks_to_sqlite.ensure_schema(conn.cursor())
+        connection.connection.execute(f"DETACH DATABASE {settings.INGEST_DB_ALIAS}")
+        sqlite_profile.attach(connection.connection, self.db, settings.INGEST_DB_ALIAS)
+
+    def write(self, sql, params=(), bump=(data_version.INGEST,)):
+        """One committed write from another connection, like a loader's."""
+        cur = self.connect(self.db).cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(sql, params)
+        for name in bump:
+            data_version.bump(cur, name)
+        cur.execute("COMMIT")
+
+
+class QueryCacheTests(IngestConnectionMixin, SimpleTestCase):
+    SQL = "SELECT COALESCE(SUM(total_cents), 0) FROM daily_spend WHERE user_id = %s"
+
+    def setUp(self):
+        super().setUp()
+        query_cache._cache.clear()
+        self.write("INSERT INTO daily_spend VALUES (1, 1, 'a', 0, '0001-01-01', 0, 101, 500, 1)")
+
+    def total(self):
+        with CaptureQueriesContext(connection) as queries, query_cache.cached_cursor() as cur:
+            cur.execute(self.SQL, [1])
+            return cur.fetchone()[0], len(queries)
+
+    def test_hit_until_the_counter_moves(self):
+        self.assertEqual(self.total(), (500, 2))   # counter + query
+        self.assertEqual(self.total(), (500, 1))   # counter only
+
+        self.write("UPDATE daily_spend SET total_cents = 700")
+        self.assertEqual(self.total(), (700, 2))
+        self.assertEqual(self.total(), (700, 1))
+
+    def test_new_ingest_file_is_a_new_generation(self):
+        self.assertEqual(self.total(), (500, 2))
+        # reloaded from scratch: the counter is back at 1, under a new instance id
+        self.attach_new_ingest_db("reloaded.sqlite3")
+        self.write("INSERT INTO daily_spend VALUES (1, 1, 'a', 0, '0001-01-01', 0, 101, 900, 1)")
+        self.assertEqual(self.total(), (900, 2))
+
+    def test_params_are_part_of_the_key(self):
+        with query_cache.cached_cursor() as cur:
+            cur.execute(self.SQL, [1])
+            self.assertEqual(cur.fetchall(), [(500,)])
+            cur.execute(self.SQL, [2])
+            self.assertEqual(cur.fetchall(), [(0,)])
+
+    def test_nothing_cached_before_any_loader_ran(self):
+        connection.connection.execute(f"DROP TABLE {settings.INGEST_DB_ALIAS}.data_versions")
+        self.assertEqual(self.total(), (500, 2))
+        self.assertEqual(self.total(), (500, 2))
+
+    def test_lru_evicts_least_recently_used_by_size(self):
+        lru = query_cache.LRUCache(max_bytes=100)
+        lru.put("a", 1, 40)
+        lru.put("b", 2, 40)
+        self.assertEqual(lru.get("a"), 1)       # "b" is now the oldest
+        lru.put("c", 3, 40)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual((lru.get("a"), lru.get("c"), lru.size), (1, 3, 80))
+
+        lru.put("a", 4, 10)                     # replacing an entry re-counts its size
+        self.assertEqual(lru.size, 50)
+        lru.put("huge", 5, 101)                 # bigger than the whole cache: not kept
+        self.assertIsNone(lru.get("huge"))
+        self.assertEqual(lru.size, 50)
+
+
+class CardCatalogTests(IngestConnectionMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(setattr, catalog, "_catalog", None)
+        catalog._catalog = None
+        self.write("INSERT INTO cards (id, card_name, issuer) VALUES (1, 'Gold', 'Amex')",
+                   bump=(data_version.CARD_CATALOG,))
+
+    def test_rebuilt_only_when_a_loader_bumps_it(self):
+        first = catalog.get_catalog()
+        self.assertIs(catalog.get_catalog(), first)
+
+        self.write("UPDATE cards SET card_name = 'Platinum'", bump=())
+        self.assertIs(catalog.get_catalog(), first)
+
+        self.write("INSERT INTO perks (card_id, idx, perk_name) VALUES (1, 0, 'Lounge')",
+                   bump=(data_version.CARD_CATALOG,))
+        rebuilt = catalog.get_catalog()
+        self.assertIsNot(rebuilt, first)
+        card, = rebuilt.cards_for(user_id=1)
+        self.assertEqual(card["card_name"], "Platinum")
+        self.assertEqual([p["perk_name"] for p in card["perks"]], ["Lounge"])
+
+    def test_rebuilt_for_a_new_ingest_file(self):
+        catalog.get_catalog()
+        self.attach_new_ingest_db("reloaded.sqlite3")
+        self.write("INSERT INTO cards (id, card_name, issuer) VALUES (1, 'Green', 'Amex')",
+                   bump=(data_version.CARD_CATALOG,))
+        card, = catalog.get_catalog().cards_for(user_id=1)
+        self.assertEqual(card["card_name"], "Green")
+
+    def test_featured_deals_loader_refreshes_it(self):
+        before = len(catalog.get_catalog().deals)
+        with query_cache.cached_cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM deals")
+        new_load_data.load(FeaturedDealsTests.DEALS, self.db)
+        self.assertEqual(len(catalog.get_catalog().deals), before + 12)
+        with query_cache.cached_cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM deals")
+            self.assertEqual(cur.fetchone(), (before + 12,))
+
+
+class GoalSpendTests(IngestConnectionMixin, SimpleTestCase):
+    SEPTEMBER = (date(2025, 9, 1), date(2025, 9, 30))
+
+    def setUp(self):
+        super().setUp()
+        loader.load(self.write_json("bills.json", {"accounts": ACCOUNTS, "transactions": TRANSACTIONS + [
+            _tx("t6", "acc_cc", 20.00, "2025-09-04", "Food and Drink", "Fast Food"),
+        ]}), self.db)
+
+    def spend(self, category):
+        return categories.goal_spend_cents(loader.DEFAULT_USER_ID, category, *self.SEPTEMBER)
+
+    def patterns(self):
+        with connection.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM category_patterns")
+            return cur.fetchone()[0]
+
+    def test_transaction_matching_several_categories_counts_once(self):
+        self.assertEqual(self.spend("Food"), 1234 + 510 + 2000)
+        categories.resolve_patterns(["Food"])
+        self.assertEqual(self.spend("Food"), 1234 + 510 + 2000)
+
+    def test_reading_an_unresolved_goal_writes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.spend("Travel"), 10000)
+        self.assertFalse([q for q in queries if not q["sql"].lstrip().upper().startswith("SELECT")])
+        self.assertEqual(self.patterns(), 0)
+
+    def test_saving_a_goal_resolves_its_pattern(self):
+        user = User.objects.create(username="goal-saver")
+        self.addCleanup(user.delete)
+        Goal.objects.create(user=user, category="Shops", limit_amount=10,
+                            period_start=self.SEPTEMBER[0], period_end=self.SEPTEMBER[1])
+        with connection.cursor() as cur:
+            cur.execute("SELECT pattern FROM category_patterns")
+            self.assertEqual(cur.fetchall(), [("Shops",)])
+        self.assertEqual(self.spend("Shops"), 10)
+
+    def test_goal_save_while_a_loader_holds_the_ingest_db(self):
+        loader_cur = self.connect(self.db).cursor()
+        loader_cur.execute("BEGIN IMMEDIATE")
+        self.addCleanup(loader_cur.execute, "ROLLBACK")
+        connection.connection.execute("PRAGMA busy_timeout = 0")
+        self.addCleanup(sqlite_profile.apply, connection.connection, settings.SQLITE_PROFILE)
+
+        categories.resolve_patterns(["Shops"])   # skipped, not "database is locked"
+        self.assertEqual(self.spend("Shops"), 10)
+        self.assertEqual(self.patterns(), 0)
+
+
+class SpendingAlertsTests(IngestConnectionMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username="alerted")
+        self.addCleanup(self.user.delete)
+        loader.load(self.write_json("bills.json", {"accounts": ACCOUNTS, "transactions": TRANSACTIONS}),
+                    self.db, user_id=self.user.id)
+
+    def count(self):
+        return alerts.spending_alerts(self.user)["spending_alert_count"]
+
+    def test_goal_changes_refresh_the_cached_alerts(self):
+        self.assertEqual(self.count(), 0)
+        goal = Goal.objects.create(user=self.user, category="Travel", limit_amount=50,
+                                   period_start=date(2025, 9, 1), period_end=date(2025, 9, 30))
+        self.assertEqual(self.count(), 1)
+        goal.delete()
+        self.assertEqual(self.count(), 0)
+
+    def test_new_transactions_refresh_the_cached_alerts(self):
+        Goal.objects.create(user=self.user, category="Shops", limit_amount=1,
+                            period_start=date(2025, 9, 1), period_end=date(2025, 9, 30))
+        self.assertEqual(self.count(), 0)
+        cur = self.connect(self.db).cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        loader.apply_transaction_deltas(cur, added=[_tx("t6", "acc_cc", 5, "2025-09-05", "Shops")])
+        cur.execute("COMMIT")
+        self.assertEqual(self.count(), 1)
+
+    def test_goal_save_while_a_loader_holds_the_ingest_db(self):
+        self.assertEqual(self.count(), 0)
+        loader_cur = self.connect(self.db).cursor()
+        loader_cur.execute("BEGIN IMMEDIATE")
+        self.addCleanup(loader_cur.execute, "ROLLBACK")
+        connection.connection.execute("PRAGMA busy_timeout = 0")
+        self.addCleanup(sqlite_profile.apply, connection.connection, settings.SQLITE_PROFILE)
+
+        Goal.objects.create(user=self.user, category="Travel", limit_amount=50,
+                            period_start=date(2025, 9, 1), period_end=date(2025, 9, 30))
+        self.assertEqual(self.count(), 1)
+
+
+class SpendingNotificationsTests(SimpleTestCase):
+    ALERTS = {"spending_alerts": [{"category": "Travel"}], "spending_alert_count": 1,
+              "spending_alert_severity": "danger"}
+
+    def context(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        return context_processors.spending_notifications(request)
+
+    def test_nothing_is_computed_until_a_template_uses_it(self):
+        with mock.patch.object(context_processors, "spending_alerts", return_value=self.ALERTS) as compute:
+            context = self.context(SimpleNamespace(is_authenticated=True))
+            compute.assert_not_called()
+            rendered = Template("{{ spending_alert_count }} {{ spending_alert_severity }}").render(Context(context))
+        self.assertEqual(rendered, "1 danger")
+        compute.assert_called_once()
+
+    def test_anonymous_users_get_no_alerts(self):
+        with mock.patch.object(context_processors, "spending_alerts") as compute:
+            context = self.context(SimpleNamespace(is_authenticated=False))
+            self.assertEqual(Template("{{ spending_alert_count }}").render(Context(context)), "0")
+        compute.assert_not_called()
+
+
+class RequestDataTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="memo")
+        Goal.objects.create(user=self.user, category="Travel", limit_amount=50,
+                            period_start=date(2025, 9, 1), period_end=date(2025, 9, 30))
+        self.request = RequestFactory().get("/dashboard/")
+        self.request.user = self.user
+
+    def test_each_dataset_is_fetched_once_per_request(self):
+        data = request_data(self.request)
+        self.assertIs(request_data(self.request), data)
+        with self.assertNumQueries(1), self.assertLogs("wallet.request_data", "DEBUG") as logs:
+            first = data.goals()
+            self.assertIs(data.goals(), first)
+        self.assertEqual(logs.output, ["DEBUG:wallet.request_data:/dashboard/: goals served from memo (hit 1)"])
+        self.assertEqual([g.category for g in first], ["Travel"])
+
+    def test_forget_refetches(self):
+        data = request_data(self.request)
+        data.goals()
+        Goal.objects.filter(user=self.user).update(category="Food")
+        data.forget("goals")
+        with self.assertNumQueries(1):
+            self.assertEqual([g.category for g in data.goals()], ["Food"])
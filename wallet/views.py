@@ -8,13 +8,20 @@ from django.db.models import Sum, Count, Q
 from django.http import JsonResponse
 import json
 
-from .models import Transaction, Card, Deal, Goal, Subscription
+from .models import Transaction, Card, Deal, Goal
 import markdown2
 from pathlib import Path
 from django.conf import settings
-from .plaid_pull import sync_plaid_to_sqlite
-from importlib.machinery import SourceFileLoader
+from .sync import sync_if_stale
+from .alerts import invalidate as invalidate_alerts
+from .catalog import get_catalog
+from .categories import goal_spend_cents, resolve_patterns
+from .money import from_cents, to_cents
+from .query_cache import cached_cursor
+from .request_data import request_data
+from .days import day_number, week_label
 import sqlite3, os, random
+import sqlite_profile
 import requests
 import certifi
 from requests.exceptions import SSLError
@@ -26,45 +33,6 @@ from django.views.decorators.csrf import csrf_exempt
 # configure Dedalus
 os.environ["DEDALUS_API_KEY"] = settings.DEDALUS_API_KEY
 
-def sync_plaid_to_sqlite(json_plaid_path, db_path, loader_path, bills_json_path=None, wipe_transactions=True):
-    """
-    Drops transactions + transaction_categories, then re-creates them by running your loader
-    on plaid_latest.json and (optionally) bills.json. Returns simple table counts.
-    """
-    db_path = str(db_path)
-    # 1) Drop the two tables (safe even if they don't exist yet)
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    if wipe_transactions:
-        cur.executescript("""
-            PRAGMA foreign_keys=OFF;
-            DROP TABLE IF EXISTS transaction_categories;
-            DROP TABLE IF EXISTS transactions;
-            PRAGMA foreign_keys=ON;
-        """)
-    conn.commit()
-    conn.close()
-
-    # 2) Import the loader module from its file path and call load(...)
-    loader_mod = SourceFileLoader("loader_bills", str(loader_path)).load_module()
-    loader_mod.load(str(json_plaid_path), db_path)
-    if bills_json_path and os.path.exists(str(bills_json_path)):
-        loader_mod.load(str(bills_json_path), db_path)
-
-    # 3) Return quick counts for debugging
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    counts = {}
-    for tbl in ("accounts","transactions","transaction_categories","items","meta","cards"):
-        try:
-            cur.execute(f"SELECT COUNT(*) FROM {tbl}")
-            counts[tbl] = cur.fetchone()[0]
-        except sqlite3.OperationalError:
-            counts[tbl] = 0
-    conn.close()
-    return counts
-
-
 def _visa_pav_verify_pan(pan: str):
     user_id = os.getenv("VISA_PAV_USER_ID")
     password = os.getenv("VISA_PAV_PASSWORD")
@@ -156,18 +124,18 @@ def dashboard(request):
     date_keys = [(start_date + timedelta(days=i)) for i in range(7)]
     date_strs = [d.isoformat() for d in date_keys]
     totals_by_date = {d: 0.0 for d in date_strs}
-    with connection.cursor() as cur:
+    with cached_cursor() as cur:
         cur.execute(
             """
-            SELECT date, COALESCE(SUM(amount), 0)
-            FROM transactions
-            WHERE date BETWEEN %s AND %s
-            GROUP BY date
+            SELECT day, COALESCE(SUM(total_cents), 0)
+            FROM daily_spend
+            WHERE user_id = %s AND day_num BETWEEN %s AND %s AND category_id = 0
+            GROUP BY day_num
             """,
-            [start_date.isoformat(), end_date.isoformat()],
+            [request.user.id, day_number(start_date), day_number(end_date)],
         )
-        for tx_date, total in cur.fetchall():
-            totals_by_date[str(tx_date)] = float(total or 0)
+        for tx_date, total_cents in cur.fetchall():
+            totals_by_date[str(tx_date)] = from_cents(total_cents)
     widget_line_categories = [d.strftime("%a") for d in date_keys]
     widget_line_series = [totals_by_date[d] for d in date_strs]
 
@@ -192,102 +160,30 @@ def perks_dashboard(request):
         cur.execute("""
             SELECT id, name, issuer, annual_fee, card_type, base_reward_rate
             FROM wallet_card
+            WHERE user_id = %s
             ORDER BY issuer, name
-        """)
-        cards = {}
-        for row in cur.fetchall():
-            card_id, name, issuer, annual_fee, card_type, base_reward_rate = row
-            cards[card_id] = {
-                "id": card_id,
-                "card_name": name,
-                "issuer": issuer,
-                "annual_fee": float(annual_fee or 0),
-                "type": card_type,
-                "base_reward_rate": float(base_reward_rate or 0),
-                "bonus_categories": [],
-                "perks": [],
-                "welcome_bonus": None,
-                "current_period": None,
-            }
+        """, [request.user.id])
+        rows = cur.fetchall()
+
+    catalog = get_catalog()
+    cards = {}
+    for card_id, name, issuer, annual_fee, card_type, base_reward_rate in rows:
+        cards[card_id] = catalog.card(
+            card_id,
+            id=card_id,
+            card_name=name,
+            issuer=issuer,
+            annual_fee=float(annual_fee or 0),
+            type=card_type,
+            base_reward_rate=float(base_reward_rate or 0),
+        )
 
     if not cards:
         return render(request, "wallet/deals.html", {"cards": [], "issuers": [], "deals": []})
 
-    valid_ids = set(cards.keys())
-
-    # Keep raw SQL for tables that do NOT have Django Models
-    with connection.cursor() as cur:
-        cur.execute("""
-          SELECT card_id, idx, category_name, reward_rate, cap, note
-          FROM bonus_categories
-          ORDER BY card_id, idx
-        """)
-        for card_id, idx, cat_name, rate, cap, note in cur.fetchall():
-            if card_id in valid_ids:
-                cards[card_id]["bonus_categories"].append({
-                    "category_name": cat_name or "",
-                    "reward_rate": float(rate or 0),
-                    "cap": None if cap is None else float(cap),
-                    "note": note or "",
-                })
-
-    with connection.cursor() as cur:
-        cur.execute("""
-          SELECT card_id, idx, perk_name, description, frequency
-          FROM perks
-          ORDER BY card_id, idx
-        """)
-        for card_id, idx, perk_name, desc, freq in cur.fetchall():
-            if card_id in valid_ids:
-                cards[card_id]["perks"].append({
-                    "perk_name": perk_name or "",
-                    "description": desc or "",
-                    "frequency": freq or "",
-                })
-
-    with connection.cursor() as cur:
-        cur.execute("""
-          SELECT card_id, points, cash_back, points_or_cash, spend_requirement, time_frame_months
-          FROM welcome_bonuses
-        """)
-        for card_id, points, cash_back, poc, spend_req, tf_months in cur.fetchall():
-            if card_id in valid_ids:
-                cards[card_id]["welcome_bonus"] = {
-                    "points": None if points is None else int(points),
-                    "cash_back": None if cash_back is None else float(cash_back),
-                    "points_or_cash": None if poc is None else float(poc),
-                    "spend_requirement": None if spend_req is None else float(spend_req),
-                    "time_frame_months": None if tf_months is None else int(tf_months),
-                }
-
-    with connection.cursor() as cur:
-        cur.execute("""
-          SELECT card_id, start_date, end_date
-          FROM card_current_period
-        """)
-        for card_id, start_date, end_date in cur.fetchall():
-            if card_id in valid_ids:
-                cards[card_id]["current_period"] = {
-                    "start_date": start_date,
-                    "end_date": end_date,
-                }
-
-    # --- Load deals from deals table ---
-    with connection.cursor() as cur:
-        try:
-            cur.execute("""
-                SELECT id, card_id, deal_type, title, subtitle, benefit, expiry_date, finer_details, issuer, card_name
-                FROM deals
-                ORDER BY expiry_date ASC, card_name ASC
-            """)
-            cols = [c[0] for c in cur.description]
-            all_deals = [dict(zip(cols, row)) for row in cur.fetchall()]
-        except Exception:
-            all_deals = []
-
     # Filter for only the selected merchants
     selected_merchants = {"Solgaard", "The Bouqs Co.", "Visible by Verizon"}
-    deals = [d for d in all_deals if d["title"] in selected_merchants]
+    deals = [d for d in catalog.deals if d["title"] in selected_merchants]
 
     issuers = sorted({(c["issuer"] or "").strip() for c in cards.values() if c["issuer"]})
     return render(request, "wallet/deals.html", {
@@ -354,79 +250,18 @@ def delete_card(request, card_id):
 def cards_dashboard(request):
     orm_cards = Card.objects.all().order_by("issuer", "name")  # Loads all cards, no user filter
 
+    catalog = get_catalog()
     cards = {}
     for c in orm_cards:
-        cards[c.id] = {
-            "id": c.id,
-            "card_name": c.name,
-            "issuer": c.issuer,
-            "annual_fee": float(c.annual_fee or 0),
-            "type": c.card_type,
-            "base_reward_rate": float(c.base_reward_rate or 0),
-            "bonus_categories": [],
-            "perks": [],
-            "welcome_bonus": None,
-            "current_period": None,
-        }
-
-    valid_ids = set(cards.keys())
-
-    # Keep raw SQL for tables that do NOT have Django Models
-    with connection.cursor() as cur:
-        cur.execute("""
-          SELECT card_id, idx, category_name, reward_rate, cap, note
-          FROM bonus_categories
-          ORDER BY card_id, idx
-        """)
-        for card_id, idx, cat_name, rate, cap, note in cur.fetchall():
-            if card_id in valid_ids:
-                cards[card_id]["bonus_categories"].append({
-                    "category_name": cat_name or "",
-                    "reward_rate": float(rate or 0),
-                    "cap": None if cap is None else float(cap),
-                    "note": note or "",
-                })
-
-    with connection.cursor() as cur:
-        cur.execute("""
-          SELECT card_id, idx, perk_name, description, frequency
-          FROM perks
-          ORDER BY card_id, idx
-        """)
-        for card_id, idx, perk_name, desc, freq in cur.fetchall():
-            if card_id in valid_ids:
-                cards[card_id]["perks"].append({
-                    "perk_name": perk_name or "",
-                    "description": desc or "",
-                    "frequency": freq or "",
-                })
-
-    with connection.cursor() as cur:
-        cur.execute("""
-          SELECT card_id, points, cash_back, points_or_cash, spend_requirement, time_frame_months
-          FROM welcome_bonuses
-        """)
-        for card_id, points, cash_back, poc, spend_req, tf_months in cur.fetchall():
-            if card_id in valid_ids:
-                cards[card_id]["welcome_bonus"] = {
-                    "points": None if points is None else int(points),
-                    "cash_back": None if cash_back is None else float(cash_back),
-                    "points_or_cash": None if poc is None else float(poc),
-                    "spend_requirement": None if spend_req is None else float(spend_req),
-                    "time_frame_months": None if tf_months is None else int(tf_months),
-                }
-
-    with connection.cursor() as cur:
-        cur.execute("""
-          SELECT card_id, start_date, end_date
-          FROM card_current_period
-        """)
-        for card_id, start_date, end_date in cur.fetchall():
-            if card_id in valid_ids:
-                cards[card_id]["current_period"] = {
-                    "start_date": start_date,
-                    "end_date": end_date,
-                }
+        cards[c.id] = catalog.card(
+            c.id,
+            id=c.id,
+            card_name=c.name,
+            issuer=c.issuer,
+            annual_fee=float(c.annual_fee or 0),
+            type=c.card_type,
+            base_reward_rate=float(c.base_reward_rate or 0),
+        )
 
     # Calculate total annual fee
     total_fee = sum(card["annual_fee"] for card in cards.values())
@@ -451,85 +286,53 @@ import os
 os.environ["DEDALUS_API_KEY"] = settings.DEDALUS_API_KEY
 
 
-def get_summary():
-    conn = sqlite3.connect("db.sqlite3")
+def get_summary(user_id):
+    conn = sqlite_profile.connect(settings.DATABASES["default"]["NAME"])
+    sqlite_profile.attach(conn, settings.INGEST_DB_PATH, settings.INGEST_DB_ALIAS)
     cur = conn.cursor()
 
-    # total spend by category (using transaction_categories)
+    # total spend by category (primary category, so each transaction counts once)
     cur.execute("""
-        SELECT c.category, ROUND(SUM(t.amount),2) as total, COUNT(*) as tx_count
-        FROM transactions t
-        JOIN transaction_categories c
-          ON t.transaction_id = c.transaction_id
-        GROUP BY c.category
+        SELECT primary_category, SUM(amount_cents) as total, COUNT(*) as tx_count
+        FROM transactions
+        WHERE user_id = ? AND primary_category IS NOT NULL
+        GROUP BY primary_category
         ORDER BY total DESC
         LIMIT 10;
-    """)
+    """, (user_id,))
     category_summary = cur.fetchall()
 
     # overall stats
-    cur.execute("SELECT ROUND(SUM(amount),2), COUNT(*) FROM transactions;")
+    cur.execute("SELECT COALESCE(SUM(amount_cents), 0), COUNT(*) FROM transactions WHERE user_id = ?;", (user_id,))
     overall_total, tx_count = cur.fetchone()
 
-    # goals progress (compare against categories + date ranges)
-    cur.execute("""
-        SELECT g.category, g.limit_amount, COALESCE(SUM(t.amount),0) as spent
-        FROM wallet_goal g
-        LEFT JOIN transactions t
-          ON EXISTS (
-              SELECT 1 FROM transaction_categories c
-              WHERE c.transaction_id = t.transaction_id
-              AND c.category LIKE '%' || g.category || '%'
-          )
-          AND t.date BETWEEN g.period_start AND g.period_end
-        GROUP BY g.id
-        ORDER BY g.period_start DESC;
-    """)
-    goals_summary = cur.fetchall()
-
     conn.close()
 
+    # goals progress, computed like the dashboard's and the alerts'
+    goals_summary = [
+        (g.category, g.limit_amount, goal_spend_cents(user_id, g.category, g.period_start, g.period_end))
+        for g in Goal.objects.filter(user_id=user_id).order_by("-period_start")
+    ]
+
     # format summaries as plain text for Gemini
     summary_text = "Recent spending summary:\n"
-    summary_text += f"- Total spent: ${overall_total} across {tx_count} transactions\n\n"
+    summary_text += f"- Total spent: ${from_cents(overall_total)} across {tx_count} transactions\n\n"
 
     summary_text += "By category:\n"
     for cat, total, count in category_summary:
-        summary_text += f"  • {cat}: ${total} ({count} tx)\n"
+        summary_text += f"  • {cat}: ${from_cents(total)} ({count} tx)\n"
 
     summary_text += "\nGoals progress:\n"
     for cat, limit_amt, spent in goals_summary:
-        summary_text += f"  • {cat}: ${spent} / ${limit_amt}\n"
+        summary_text += f"  • {cat}: ${from_cents(spent)} / ${limit_amt}\n"
 
     return summary_text
 
 @csrf_exempt
 @login_required
 def spending_dashboard(request):
-     # --- auto-sync Plaid Sandbox into SQLite on each page load ---
-    try:
-        base = Path(settings.BASE_DIR)
-        json_plaid   = (base / "plaid_latest.json").resolve()
-        json_bills   = (base / "bills.json").resolve()    # optional
-        loader_path  = (base / "load_bills_to_sqlite.py").resolve()
-
-        # Use the SAME DB file Django uses
-        if settings.DATABASES["default"]["ENGINE"].endswith("sqlite3"):
-            db_path = Path(settings.DATABASES["default"]["NAME"]).resolve()
-        else:
-            db_path = (base / "db.sqlite3").resolve()
-
-        counts = sync_plaid_to_sqlite(
-            json_plaid_path=json_plaid,
-            db_path=db_path,
-            loader_path=loader_path,
-            bills_json_path=json_bills if json_bills.exists() else None,
-            wipe_transactions=True,   # <— the destructive refresh you asked for
-        )
-        print("[spending_dashboard] Post-load counts:", counts)
-    except Exception as e:
-        print("Plaid sandbox sync skipped:", e)
-
+    # --- refresh Plaid Sandbox data in the background when stale (page only reads) ---
+    sync_if_stale()
 
     analysis = None
 
@@ -538,7 +341,9 @@ def spending_dashboard(request):
         if "delete_goal_id" in request.POST:
             delete_goal_id = request.POST.get("delete_goal_id")
             with connection.cursor() as cur:
-                cur.execute("DELETE FROM wallet_goal WHERE id = %s AND user_id = 1;", [delete_goal_id])
+                cur.execute("DELETE FROM wallet_goal WHERE id = %s AND user_id = %s;",
+                            [delete_goal_id, request.user.id])
+            invalidate_alerts(request.user.id)
 
         elif "category" in request.POST:  # add new goal
             category = request.POST.get("category")
@@ -549,11 +354,13 @@ def spending_dashboard(request):
             with connection.cursor() as cur:
                 cur.execute("""
                     INSERT INTO wallet_goal (category, limit_amount, current_spend, period_start, period_end, user_id)
-                    VALUES (%s, %s, 0, %s, %s, 1);
-                """, [category, limit_amount, period_start, period_end])
+                    VALUES (%s, %s, 0, %s, %s, %s);
+                """, [category, limit_amount, period_start, period_end, request.user.id])
+            resolve_patterns([category])
+            invalidate_alerts(request.user.id)
 
         elif "analyze_spending" in request.POST:  # AI button
-            summary_text = get_summary()
+            summary_text = get_summary(request.user.id)
             prompt = (
                 "You are a financial analysis assistant. "
                 "Based on this spending summary, identify trends, "
@@ -575,61 +382,53 @@ def spending_dashboard(request):
             analysis = markdown2.markdown(resp_text)
 
     # --- Transactions ---
-    with connection.cursor() as cur:
+    with cached_cursor() as cur:
         cur.execute("""
             SELECT
                 t.transaction_id,
                 COALESCE(t.merchant_name, t.name, 'Unknown') AS merchant,
-                COALESCE(
-                    (SELECT GROUP_CONCAT(c.category, ' / ')
-                     FROM transaction_categories c
-                     WHERE c.transaction_id = t.transaction_id),
-                    ''
-                ) AS category,
+                COALESCE(t.category_path, '') AS category,
                 t.date AS date,
-                t.amount AS amount
+                t.amount_cents AS amount
             FROM transactions t
-            ORDER BY date DESC
+            WHERE t.user_id = %s
+            ORDER BY t.day_num DESC
             LIMIT 100;
-        """)
+        """, [request.user.id])
         cols = [c[0] for c in cur.description]
         rows = cur.fetchall()
         transactions = [dict(zip(cols, r)) for r in rows]
+        for t in transactions:
+            t["amount"] = from_cents(t["amount"])
 
     # Pull card names from the cards table for UI mapping (no DB writes)
     card_names = []
-    with connection.cursor() as cur:
+    with cached_cursor() as cur:
         try:
-            cur.execute("SELECT card_name FROM cards ORDER BY issuer, card_name")
+            cur.execute("""
+                SELECT card_name FROM cards
+                WHERE user_id IS NULL OR user_id = %s
+                ORDER BY issuer, card_name
+            """, [request.user.id])
             card_names = [r[0] for r in cur.fetchall() if r and r[0]]
         except Exception:
             card_names = []
 
-    # --- Goals ---
-    with connection.cursor() as cur:
-        cur.execute("""
-            SELECT id, category, limit_amount, period_start, period_end
-            FROM wallet_goal
-            WHERE user_id = 1
-            ORDER BY period_start DESC;
-        """)
-        cols = [c[0] for c in cur.description]
-        raw_goals = [dict(zip(cols, r)) for r in cur.fetchall()]
-
+    # --- Goals (shared with the alerts context processor) ---
+    data = request_data(request)
     goals = []
-    for g in raw_goals:
-        with connection.cursor() as cur:
-            cur.execute("""
-                SELECT COALESCE(SUM(amount), 0)
-                FROM transactions t
-                JOIN transaction_categories c
-                  ON c.transaction_id = t.transaction_id
-                WHERE c.category LIKE %s
-                  AND t.date BETWEEN %s AND %s;
-            """, [f"%{g['category']}%", g["period_start"], g["period_end"]])
-            current_spend = float(cur.fetchone()[0] or 0)
-
-        pct = (current_spend / float(g["limit_amount"])) * 100 if g["limit_amount"] else 0
+    for goal in data.goals():
+        g = {
+            "id": goal.id,
+            "category": goal.category,
+            "limit_amount": goal.limit_amount,
+            "period_start": goal.period_start,
+            "period_end": goal.period_end,
+        }
+        spent_cents = goal_spend_cents(request.user.id, g["category"], g["period_start"], g["period_end"])
+        limit_cents = to_cents(g["limit_amount"])
+
+        pct = (spent_cents / limit_cents) * 100 if limit_cents else 0
         if pct >= 75:
             color = "#ef4444"
         elif pct >= 50:
@@ -639,15 +438,15 @@ def spending_dashboard(request):
 
         goals.append({
             **g,
-            "current_spend": current_spend,
+            "current_spend": from_cents(spent_cents),
             "pct": pct,
             "color": color,
         })
 
-    budget = sum(float(g["limit_amount"]) for g in goals) if goals else 2000
+    budget = from_cents(sum(to_cents(g["limit_amount"]) for g in goals)) if goals else 2000
 
     # Subscriptions panel data (read-only, no DB writes)
-    subs_qs = Subscription.objects.filter(user=request.user)
+    subs_qs = data.subscriptions()
     def _manage_url(merchant: str) -> str:
         if not merchant:
             return ""
@@ -662,7 +461,7 @@ def spending_dashboard(request):
             return "https://chatgpt.com/account/manage"
         return ""
     subscriptions = []
-    if subs_qs.exists():
+    if subs_qs:
         for s in subs_qs:
             subscriptions.append({
                 "merchant": s.merchant,
@@ -728,7 +527,7 @@ def spending_dashboard(request):
 
 @login_required
 def subscriptions_dashboard(request):
-    subs_qs = Subscription.objects.filter(user=request.user)
+    subs_qs = request_data(request).subscriptions()
 
     def _manage_url(merchant: str) -> str:
         if not merchant:
@@ -745,7 +544,7 @@ def subscriptions_dashboard(request):
         return ""
 
     subscriptions = []
-    if subs_qs.exists():
+    if subs_qs:
         for s in subs_qs:
             subscriptions.append({
                 "merchant": s.merchant,
@@ -885,94 +684,104 @@ Use tables, bullet points, and clear numerical comparisons. Always show your cal
             system_prompt = feature_prompts.get(feature, feature_prompts['general'])
 
             # Get user's financial context
-            with connection.cursor() as cur:
+            today = day_number(date.today())
+            user_id = request.user.id
+            with cached_cursor() as cur:
                 # Get transaction summary
                 cur.execute("""
                     SELECT
-                        COUNT(*) as tx_count,
-                        COALESCE(SUM(amount), 0) as total_spending,
-                        COALESCE(AVG(amount), 0) as avg_amount
-                    FROM transactions
-                    WHERE date >= date('now', '-30 days')
-                """)
-                tx_stats = cur.fetchone()
+                        COALESCE(SUM(count), 0) as tx_count,
+                        COALESCE(SUM(total_cents), 0) as total_spending,
+                        COALESCE(SUM(total_cents) * 1.0 / SUM(count), 0) as avg_amount
+                    FROM daily_spend
+                    WHERE user_id = %s AND day_num >= %s AND category_id = 0
+                """, [user_id, today - 30])
+                tx_count, total_cents, avg_cents = cur.fetchone()
+                tx_stats = (tx_count, from_cents(total_cents), from_cents(avg_cents))
 
                 # Get spending by category
                 cur.execute("""
-                    SELECT c.category, ROUND(SUM(t.amount), 2) as total
-                    FROM transactions t
-                    JOIN transaction_categories c ON t.transaction_id = c.transaction_id
-                    WHERE t.date >= date('now', '-30 days')
-                    GROUP BY c.category
+                    SELECT k.name, SUM(d.total_cents) as total
+                    FROM daily_spend d
+                    JOIN categories k ON k.id = d.category_id
+                    WHERE d.user_id = %s AND d.day_num >= %s
+                    GROUP BY k.name
                     ORDER BY total DESC
                     LIMIT 5
-                """)
-                top_categories = cur.fetchall()
+                """, [user_id, today - 30])
+                top_categories = [(cat, from_cents(total)) for cat, total in cur.fetchall()]
 
                 # Enhanced analytics data (only for analytics feature)
                 if feature == 'analytics':
                     # Weekly spending trend (last 4 weeks)
                     cur.execute("""
                         SELECT
-                            strftime('%Y-W%W', date) as week,
-                            COUNT(*) as tx_count,
-                            ROUND(SUM(amount), 2) as total
-                        FROM transactions
-                        WHERE date >= date('now', '-28 days')
+                            MIN(day) as week_start,
+                            SUM(count) as tx_count,
+                            SUM(total_cents) as total
+                        FROM daily_spend
+                        WHERE user_id = %s AND day_num >= %s AND category_id = 0
                         GROUP BY week
                         ORDER BY week
-                    """)
-                    weekly_trend = cur.fetchall()
+                    """, [user_id, today - 28])
+                    weekly_trend = [(week_label(day), count, from_cents(total))
+                                    for day, count, total in cur.fetchall()]
 
                     # Top merchants
                     cur.execute("""
                         SELECT
                             COALESCE(merchant_name, name, 'Unknown') as merchant,
                             COUNT(*) as tx_count,
-                            ROUND(SUM(amount), 2) as total,
-                            ROUND(AVG(amount), 2) as avg_amount
+                            SUM(amount_cents) as total,
+                            AVG(amount_cents) as avg_amount
                         FROM transactions
-                        WHERE date >= date('now', '-30 days')
+                        WHERE user_id = %s AND day_num >= %s
                         GROUP BY merchant
                         ORDER BY total DESC
                         LIMIT 10
-                    """)
-                    top_merchants = cur.fetchall()
+                    """, [user_id, today - 30])
+                    top_merchants = [(m, count, from_cents(total), from_cents(avg))
+                                     for m, count, total, avg in cur.fetchall()]
 
                     # Spending by category with percentage
                     cur.execute("""
                         SELECT
-                            c.category,
-                            COUNT(*) as tx_count,
-                            ROUND(SUM(t.amount), 2) as total,
-                            ROUND(AVG(t.amount), 2) as avg_amount
-                        FROM transactions t
-                        JOIN transaction_categories c ON t.transaction_id = c.transaction_id
-                        WHERE t.date >= date('now', '-30 days')
-                        GROUP BY c.category
+                            k.name,
+                            SUM(d.count) as tx_count,
+                            SUM(d.total_cents) as total,
+                            SUM(d.total_cents) * 1.0 / SUM(d.count) as avg_amount
+                        FROM daily_spend d
+                        JOIN categories k ON k.id = d.category_id
+                        WHERE d.user_id = %s AND d.day_num >= %s
+                        GROUP BY k.name
                         ORDER BY total DESC
-                    """)
-                    category_breakdown = cur.fetchall()
+                    """, [user_id, today - 30])
+                    category_breakdown = [(cat, count, from_cents(total), from_cents(avg))
+                                          for cat, count, total, avg in cur.fetchall()]
 
                     # Comparison with previous period
                     cur.execute("""
                         SELECT
-                            COUNT(*) as tx_count,
-                            COALESCE(SUM(amount), 0) as total_spending
-                        FROM transactions
-                        WHERE date >= date('now', '-60 days')
-                        AND date < date('now', '-30 days')
-                    """)
-                    prev_period_stats = cur.fetchone()
+                            COALESCE(SUM(count), 0) as tx_count,
+                            COALESCE(SUM(total_cents), 0) as total_spending
+                        FROM daily_spend
+                        WHERE user_id = %s
+                        AND day_num >= %s
+                        AND day_num < %s
+                        AND category_id = 0
+                    """, [user_id, today - 60, today - 30])
+                    prev_count, prev_cents = cur.fetchone()
+                    prev_period_stats = (prev_count, from_cents(prev_cents))
                 else:
                     weekly_trend = []
                     top_merchants = []
                     category_breakdown = []
                     prev_period_stats = None
 
-            # Get goals from Django ORM
-            goals = Goal.objects.filter(user=request.user)
-            cards = Card.objects.filter(user=request.user)
+            # Get goals and wallet cards (fetched once, however often they're read below)
+            data = request_data(request)
+            goals = data.goals()
+            cards = data.cards()
 
             # Build financial context based on feature
             if feature == 'analytics':
@@ -1012,7 +821,7 @@ FINANCIAL DATA ANALYSIS (Last 30 Days)
                     for merchant, count, total, avg in top_merchants[:5]:
                         financial_context += f"\n• {merchant}: ${total} total - {count} transactions @ ${avg} avg"
 
-                if goals.exists():
+                if goals:
                     financial_context += "\n\n=== BUDGET GOALS STATUS ==="
                     for goal in goals:
                         pct = (goal.current_spend / goal.limit_amount * 100) if goal.limit_amount > 0 else 0
@@ -1033,15 +842,15 @@ Top Spending Categories:"""
                 for cat, total in top_categories:
                     financial_context += f"\n  • {cat}: ${total}"
 
-                if goals.exists():
+                if goals:
                     financial_context += "\n\nACTIVE GOALS:"
                     for goal in goals:
                         pct = (goal.current_spend / goal.limit_amount * 100) if goal.limit_amount > 0 else 0
                         status = "⚠️ Over" if pct > 100 else "✓ On track" if pct < 75 else "⚡ Near limit"
                         financial_context += f"\n  • {goal.category}: ${goal.current_spend:.2f} / ${goal.limit_amount:.2f} ({pct:.0f}%) {status}"
 
-            if cards.exists():
-                financial_context += f"\n\nCREDIT CARDS: {cards.count()} cards in wallet"
+            if cards:
+                financial_context += f"\n\nCREDIT CARDS: {len(cards)} cards in wallet"
 
             # Build prompt with context and conversation history
             prompt_parts = [system_prompt, "", financial_context, ""]
@@ -1090,103 +899,90 @@ Top Spending Categories:"""
 @login_required
 def agent_wrapped(request):
     """Return the user's last 30 days of spending as a categorized 'wrapped' summary."""
-    # --- auto-sync Plaid Sandbox into SQLite (same as spending_dashboard) ---
-    try:
-        base = Path(settings.BASE_DIR)
-        json_plaid   = (base / "plaid_latest.json").resolve()
-        json_bills   = (base / "bills.json").resolve()
-        loader_path  = (base / "load_bills_to_sqlite.py").resolve()
-
-        if settings.DATABASES["default"]["ENGINE"].endswith("sqlite3"):
-            db_path = Path(settings.DATABASES["default"]["NAME"]).resolve()
-        else:
-            db_path = (base / "db.sqlite3").resolve()
-
-        sync_plaid_to_sqlite(
-            json_plaid_path=json_plaid,
-            db_path=db_path,
-            loader_path=loader_path,
-            bills_json_path=json_bills if json_bills.exists() else None,
-            wipe_transactions=True,
-        )
-    except Exception as e:
-        print("Plaid sandbox sync skipped (wrapped):", e)
+    # --- refresh Plaid Sandbox data in the background when stale (same as spending_dashboard) ---
+    sync_if_stale()
 
+    user_id = request.user.id
     try:
-        with connection.cursor() as cur:
+        with cached_cursor() as cur:
             # Overall stats
             cur.execute("""
                 SELECT
-                    COUNT(*) as tx_count,
-                    COALESCE(SUM(amount), 0) as total_spending,
-                    COALESCE(AVG(amount), 0) as avg_amount,
-                    COALESCE(MAX(amount), 0) as max_amount
-                FROM transactions
-            """)
+                    COALESCE(SUM(count), 0) as tx_count,
+                    COALESCE(SUM(total_cents), 0) as total_spending,
+                    COALESCE(SUM(total_cents) * 1.0 / SUM(count), 0) as avg_amount,
+                    (SELECT COALESCE(MAX(amount_cents), 0) FROM transactions WHERE user_id = %s) as max_amount
+                FROM daily_spend
+                WHERE user_id = %s AND category_id = 0
+            """, [user_id, user_id])
             row = cur.fetchone()
             tx_count, total_spending, avg_amount, max_amount = row
 
             # Spending by category
             cur.execute("""
-                SELECT c.category, ROUND(SUM(t.amount), 2) as total, COUNT(*) as cnt
-                FROM transactions t
-                JOIN transaction_categories c ON t.transaction_id = c.transaction_id
-                GROUP BY c.category
+                SELECT k.name, SUM(d.total_cents) as total, SUM(d.count) as cnt
+                FROM daily_spend d
+                JOIN categories k ON k.id = d.category_id
+                WHERE d.user_id = %s
+                GROUP BY k.name
                 ORDER BY total DESC
-            """)
+            """, [user_id])
             categories = [
-                {"name": r[0], "total": float(r[1]), "count": r[2]}
+                {"name": r[0], "total": from_cents(r[1]), "count": r[2]}
                 for r in cur.fetchall()
             ]
 
             # Top merchant by total spend
             cur.execute("""
                 SELECT COALESCE(merchant_name, name, 'Unknown') as merchant,
-                       ROUND(SUM(amount), 2) as total, COUNT(*) as cnt
+                       SUM(amount_cents) as total, COUNT(*) as cnt
                 FROM transactions
+                WHERE user_id = %s
                 GROUP BY merchant
                 ORDER BY total DESC
                 LIMIT 1
-            """)
+            """, [user_id])
             top_merchant_row = cur.fetchone()
             top_merchant = (
-                {"name": top_merchant_row[0], "total": float(top_merchant_row[1]), "count": top_merchant_row[2]}
+                {"name": top_merchant_row[0], "total": from_cents(top_merchant_row[1]), "count": top_merchant_row[2]}
                 if top_merchant_row else None
             )
 
             # Most frequent merchant
             cur.execute("""
                 SELECT COALESCE(merchant_name, name, 'Unknown') as merchant,
-                       COUNT(*) as cnt, ROUND(SUM(amount), 2) as total
+                       COUNT(*) as cnt, SUM(amount_cents) as total
                 FROM transactions
+                WHERE user_id = %s
                 GROUP BY merchant
                 ORDER BY cnt DESC
                 LIMIT 1
-            """)
+            """, [user_id])
             freq_merchant_row = cur.fetchone()
             freq_merchant = (
-                {"name": freq_merchant_row[0], "count": freq_merchant_row[1], "total": float(freq_merchant_row[2])}
+                {"name": freq_merchant_row[0], "count": freq_merchant_row[1], "total": from_cents(freq_merchant_row[2])}
                 if freq_merchant_row else None
             )
 
             # Biggest single purchase
             cur.execute("""
                 SELECT COALESCE(merchant_name, name, 'Unknown') as merchant,
-                       amount, date
+                       amount_cents, date
                 FROM transactions
-                ORDER BY amount DESC
+                WHERE user_id = %s
+                ORDER BY amount_cents DESC
                 LIMIT 1
-            """)
+            """, [user_id])
             biggest_row = cur.fetchone()
             biggest_purchase = (
-                {"merchant": biggest_row[0], "amount": float(biggest_row[1]), "date": biggest_row[2]}
+                {"merchant": biggest_row[0], "amount": from_cents(biggest_row[1]), "date": biggest_row[2]}
                 if biggest_row else None
             )
 
         return JsonResponse({
             "tx_count": tx_count,
-            "total_spending": float(total_spending),
-            "avg_amount": round(float(avg_amount), 2),
+            "total_spending": from_cents(total_spending),
+            "avg_amount": from_cents(avg_amount),
             "categories": categories,
             "top_merchant": top_merchant,
             "freq_merchant": freq_merchant,